@@ -1,12 +1,15 @@
 # import necessary modules
 import os
+import logging
 import pygame
+from constants import DEFAULT_MIXER
+from utils import init_mixer, set_audio_driver
 
 def init_pygame_with_audio_fallback():
     """
     Safe for HDMI displays with no audio device:
     - Runs pygame.init() normally
-    - Re-inits mixer separately with fallback drivers
+    - Re-inits mixer separately with the cached (or probed) driver
     - Prevents SHUGRPi from crashing on missing ALSA/HDMI audio
     """
 
@@ -19,40 +22,12 @@ def init_pygame_with_audio_fallback():
     # Full pygame init (display, font, joystick, etc.)
     pygame.init()
 
-    # Shut down mixer that pygame.init() may have started with dummy
-    # pygame.mixer.quit()
-
-    # Preferred real drivers in order
-    drivers = ["wasapi", "alsa", "dummy"]
-
-    active_driver = None
-
-    for driver in drivers:
-        try:
-            # Force SDL backend for this attempt
-            os.environ["SDL_AUDIODRIVER"] = driver
-
-            # Make sure previous failed init is cleared
-            pygame.mixer.quit()
-
-            # Re-init mixer only
-            pygame.mixer.init(
-                frequency=44100,
-                size=-16,
-                channels=2,
-                buffer=512
-            )
-
-            active_driver = driver
-            print(f"Audio initialized with: {pygame.mixer.get_driver()}")
-            break
-
-        except pygame.error as e:
-            print(f"Failed audio driver: {driver} ({e})")
+    # Re-init mixer with the same cached driver probe the OS uses
+    active_driver = init_mixer(logging.getLogger(), DEFAULT_MIXER)
 
     # Absolute failsafe
     if active_driver is None:
-        os.environ["SDL_AUDIODRIVER"] = "dummy"
+        set_audio_driver("dummy")
         pygame.mixer.quit()
         pygame.mixer.init()
         active_driver = "dummy"
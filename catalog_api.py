@@ -0,0 +1,204 @@
+"""Game-catalog API for the SHUGRPi OS"""
+
+import shutil
+import json
+import math
+import os
+import re
+
+
+# blobless, sparse clone of the catalog
+base_path = os.path.dirname(os.path.abspath(__file__))
+catalog_path = os.path.join(base_path, "data", "catalog")
+CATALOG_REPO = "https://github.com/Stormwrecker/shugrpi_os_master.git"
+
+# paths inside of the catalog repository
+TITLES_PATH = "catalog/titles.json"
+GAMES_PATH = "catalog/games"
+
+# most object ids handed to a single `git fetch`
+MAX_FETCH_BATCH = 100
+
+
+# escape a name for use in a sparse-checkout pattern
+def _escape_pattern(name):
+    for char in "\\*?[!#":
+        name = name.replace(char, "\\" + char)
+    return name
+
+
+# catalog sync engine (only titles.json and the selected games are ever downloaded)
+class CatalogSync:
+    def __init__(self, runner, logger, repo=CATALOG_REPO, path=catalog_path, branch="main"):
+        """
+        Keeps a blobless partial clone of ``repo`` at ``path``. Commits and trees are cheap, so
+        every game can be listed, but file contents are only fetched for ``catalog/titles.json``
+        and the games added with ``add_game``.
+
+        All methods block; run them on a background worker (e.g. ``runner.submit_func(..., background=True)``).
+
+        :param runner: ``CommandRunner`` used to run git
+        """
+        self.runner = runner
+        self.logger = logger
+        self.repo = repo
+        self.path = path
+        self.branch = branch
+
+    def is_initialized(self):
+        return os.path.isdir(os.path.join(self.path, ".git"))
+
+    def init(self):
+        if self.is_initialized():
+            return True
+
+        # clone next to the final location, then move it into place
+        temp = self.path + ".tmp"
+        if os.path.exists(temp):
+            shutil.rmtree(temp, ignore_errors=True)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self.logger.info(f"CatalogSync: cloning catalog from `{self.repo}`...")
+        result = self.runner.execute(["git", "clone", "--quiet", "--filter=blob:none", "--no-checkout", "--branch", self.branch, self.repo, temp], timeout=600)
+        if result.code != 0:
+            self.logger.error(f"CatalogSync: failed to clone catalog: {result.stderr.strip()}")
+            return False
+
+        for args in (["sparse-checkout", "set", "--no-cone", "/" + TITLES_PATH], ["checkout", "--quiet", self.branch]):
+            result = self.runner.execute(["git", *args], timeout=300, cwd=temp)
+            if result.code != 0:
+                self.logger.error(f"CatalogSync: failed to check out catalog: {result.stderr.strip()}")
+                return False
+
+        os.replace(temp, self.path)
+        self.logger.info("CatalogSync: catalog ready")
+        return True
+
+    """catalog contents"""
+    def get_titles(self):
+        try:
+            with open(os.path.join(self.path, TITLES_PATH), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def list_games(self, commit="HEAD"):
+        """every game in the catalog (trees are part of the clone, so nothing is fetched)"""
+        result = self._git("ls-tree", "-d", "--name-only", commit, GAMES_PATH + "/")
+        if result.code != 0:
+            return []
+        return [os.path.basename(line) for line in result.stdout.splitlines()]
+
+    def get_selected(self):
+        result = self._git("sparse-checkout", "list")
+        if result.code != 0:
+            return []
+
+        prefix = f"/{GAMES_PATH}/"
+        selected = []
+        for pattern in result.stdout.splitlines():
+            if pattern.startswith(prefix) and pattern.endswith("/"):
+                name = pattern[len(prefix):-1]
+                selected.append(re.sub(r"\\(.)", r"\1", name))
+        return selected
+
+    def get_game_path(self, name):
+        return os.path.join(self.path, GAMES_PATH, name)
+
+    """syncing"""
+    def add_game(self, name, on_progress=None):
+        """
+        Download a single game (costs only that game's bytes).
+
+        :param on_progress: called with (fetched objects, total objects) as batches arrive
+        """
+        if name not in self.list_games():
+            self.logger.warning(f"CatalogSync: `{name}` is not in the catalog")
+            return False
+
+        if not self._prefetch("HEAD", [f"{GAMES_PATH}/{name}"], on_progress):
+            return False
+
+        result = self._git("sparse-checkout", "add", self._get_pattern(name), timeout=300)
+        if result.code != 0:
+            self.logger.error(f"CatalogSync: failed to check out `{name}`: {result.stderr.strip()}")
+            return False
+
+        self.logger.info(f"CatalogSync: added `{name}`")
+        return True
+
+    def remove_game(self, name):
+        selected = [game for game in self.get_selected() if game != name]
+        result = self._set_sparse_patterns(selected)
+        if result.code != 0:
+            self.logger.error(f"CatalogSync: failed to remove `{name}`: {result.stderr.strip()}")
+            return False
+
+        self.logger.info(f"CatalogSync: removed `{name}`")
+        return True
+
+    def update(self, on_progress=None):
+        """fetch the newest catalog and the changed files of the selected games"""
+        result = self._git("fetch", "--quiet", "--filter=blob:none", "origin", self.branch, timeout=300)
+        if result.code != 0:
+            self.logger.warning(f"CatalogSync: failed to fetch catalog: {result.stderr.strip()}")
+            return False
+
+        target = f"origin/{self.branch}"
+        paths = [TITLES_PATH] + [f"{GAMES_PATH}/{name}" for name in self.get_selected()]
+        if not self._prefetch(target, paths, on_progress):
+            return False
+
+        # every blob is present now, so the checkout never stalls on the network
+        result = self._git("reset", "--hard", "--quiet", target, timeout=300)
+        if result.code != 0:
+            self.logger.error(f"CatalogSync: failed to update catalog: {result.stderr.strip()}")
+            return False
+        return True
+
+    def _prefetch(self, commit, paths, on_progress=None):
+        # files under the given paths (trees are local, so listing them never fetches)
+        result = self._git("ls-tree", "-r", commit, "--", *paths)
+        if result.code != 0:
+            self.logger.error(f"CatalogSync: failed to list files: {result.stderr.strip()}")
+            return False
+        wanted = [line.split()[2] for line in result.stdout.splitlines() if line.split()[1] == "blob"]
+
+        # keep the ones that are not downloaded yet
+        result = self._git("rev-list", "--objects", "--no-walk", "--missing=print", f"{commit}^{{tree}}")
+        if result.code != 0:
+            self.logger.error(f"CatalogSync: failed to list objects: {result.stderr.strip()}")
+            return False
+        absent = {line[1:] for line in result.stdout.splitlines() if line.startswith("?")}
+        missing = [oid for oid in dict.fromkeys(wanted) if oid in absent]
+
+        total = len(missing)
+        if on_progress is not None:
+            on_progress(0, total)
+
+        # fetch in batches so progress can be reported
+        batch_size = max(1, min(MAX_FETCH_BATCH, math.ceil(total / 10)))
+        for i in range(0, total, batch_size):
+            batch = missing[i:i + batch_size]
+            result = self._git("-c", "fetch.negotiationAlgorithm=noop", "fetch", "--quiet", "--no-tags", "--no-write-fetch-head",
+                               "--recurse-submodules=no", "--filter=blob:none", "origin", *batch, timeout=600)
+            if result.code != 0:
+                self.logger.error(f"CatalogSync: failed to download game files: {result.stderr.strip()}")
+                return False
+            if on_progress is not None:
+                on_progress(min(i + batch_size, total), total)
+
+        return True
+
+    def _get_pattern(self, name):
+        return f"/{GAMES_PATH}/{_escape_pattern(name)}/"
+
+    def _set_sparse_patterns(self, games):
+        patterns = ["/" + TITLES_PATH] + [self._get_pattern(name) for name in games]
+        return self._git("sparse-checkout", "set", "--no-cone", *patterns, timeout=300)
+
+    def _git(self, *args, timeout=30):
+        return self.runner.execute(["git", *args], timeout=timeout, cwd=self.path)
+
+
+__all__ = ["CatalogSync"]
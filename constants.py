@@ -60,12 +60,35 @@ SHUGRPi OS save data
 ``loaded_games`` is all the games and whether they are installed or not
 ``last_timestamp`` is the time when the SHUGRPi last shut off
 ``network`` is the network that was last connected to
+``mixer`` is the mixer profile (sample rate, sample size, output channels, buffer size in samples,
+number of mixing channels, and whether to log an estimate of input-to-sound latency)
+``input`` is the input profile (whether input is handled before the simulation steps of a frame,
+and whether to log input-to-photon latency)
 """
+DEFAULT_MIXER = {"frequency":44100,
+                 "size":-16,
+                 "channels":2,
+                 "buffer":512,
+                 "num_channels":16,
+                 "estimate_latency":False}
+
+DEFAULT_INPUT = {"input_first":True,
+                 "measure_latency":False}
+
 DEFAULT_SAVE = {"sort":0.0,
                 "num_games":0,
                 "loaded_games":[],
                 "last_timestamp":None,
-                "network":{"ssid":None, "psk-key":None}}
+                "network":{"ssid":None, "psk-key":None},
+                "known_ssids":[],
+                "mixer":DEFAULT_MIXER,
+                "input":DEFAULT_INPUT}
+
+# most SSIDs remembered for completion
+MAX_KNOWN_SSIDS = 20
+
+# mixing channels reserved for UI sounds
+UI_CHANNELS = 2
 
 # messages
 WELCOME_MSG = "Welcome to the SHUGRPi!"
@@ -75,15 +98,16 @@ INSTALLATION_MSG = " must be fully installed before playing. Continue? ^(this re
 # get pygame for necessary values
 from pygame.locals import *
 
-# available inputs for the SHUGRPi
-INPUT_BINDINGS = {"UP":    [K_UP, HAT_UP, CONTROLLER_BUTTON_DPAD_UP],
-                  "DOWN":  [K_DOWN, HAT_DOWN, CONTROLLER_BUTTON_DPAD_DOWN],
-                  "LEFT":  [K_LEFT, HAT_LEFT, CONTROLLER_BUTTON_DPAD_LEFT],
-                  "RIGHT": [K_RIGHT, HAT_RIGHT, CONTROLLER_BUTTON_DPAD_RIGHT],
-                  "A":     [K_a, CONTROLLER_BUTTON_A],
-                  "B":     [K_b, CONTROLLER_BUTTON_B],
-                  "X":     [K_x, CONTROLLER_BUTTON_X],
-                  "Y":     [K_y, CONTROLLER_BUTTON_Y],
-                  "SELECT":[K_RSHIFT, CONTROLLER_AXIS_TRIGGERLEFT],
-                  "START": [K_RETURN, CONTROLLER_BUTTON_START],
-                  "POWER": [K_ESCAPE, CONTROLLER_AXIS_TRIGGERRIGHT]}
+# available inputs for the SHUGRPi (logical button: keyboard keys, controller buttons, joystick hat directions
+# and controller axes as (axis, direction)); the UI treats START like A, and Backspace goes back like B
+INPUT_BINDINGS = {"UP":    {"keys": [K_UP], "buttons": [CONTROLLER_BUTTON_DPAD_UP], "hats": [HAT_UP], "axes": [(CONTROLLER_AXIS_LEFTY, -1)]},
+                  "DOWN":  {"keys": [K_DOWN], "buttons": [CONTROLLER_BUTTON_DPAD_DOWN], "hats": [HAT_DOWN], "axes": [(CONTROLLER_AXIS_LEFTY, 1)]},
+                  "LEFT":  {"keys": [K_LEFT], "buttons": [CONTROLLER_BUTTON_DPAD_LEFT], "hats": [HAT_LEFT], "axes": [(CONTROLLER_AXIS_LEFTX, -1)]},
+                  "RIGHT": {"keys": [K_RIGHT], "buttons": [CONTROLLER_BUTTON_DPAD_RIGHT], "hats": [HAT_RIGHT], "axes": [(CONTROLLER_AXIS_LEFTX, 1)]},
+                  "A":     {"keys": [K_a], "buttons": [CONTROLLER_BUTTON_A]},
+                  "B":     {"keys": [K_BACKSPACE, K_b], "buttons": [CONTROLLER_BUTTON_B]},
+                  "X":     {"keys": [K_x], "buttons": [CONTROLLER_BUTTON_X]},
+                  "Y":     {"keys": [K_y], "buttons": [CONTROLLER_BUTTON_Y]},
+                  "SELECT":{"keys": [K_RSHIFT], "buttons": [CONTROLLER_BUTTON_BACK], "axes": [(CONTROLLER_AXIS_TRIGGERLEFT, 1)]},
+                  "START": {"keys": [K_RETURN], "buttons": [CONTROLLER_BUTTON_START]},
+                  "POWER": {"keys": [K_ESCAPE], "axes": [(CONTROLLER_AXIS_TRIGGERRIGHT, 1)]}}
@@ -0,0 +1,77 @@
+"""
+Import-time benchmark for the SHUGRPi OS
+
+Runs ``python -X importtime`` on the modules ``main.py`` imports before the logo shows and
+fails if a deferred module gets imported up front (or if the total goes over ``--budget``).
+
+Usage: python import_benchmark.py [--runs N] [--budget MS]
+"""
+
+# import necessary modules
+import subprocess
+import argparse
+import sys
+import os
+
+# modules main.py imports before the first frame
+STARTUP_MODULES = ["pygame", "utils", "constants", "linux_api", "installation_api", "update_api", "virtual_keyboard", "input_api"]
+
+# modules that must only be imported once they are used
+DEFERRED_MODULES = ["subprocess", "socket", "select", "hashlib", "concurrent.futures", "network_api", "catalog_api"]
+
+base_path = os.path.dirname(os.path.abspath(__file__))
+
+
+# import the startup modules in a fresh interpreter and parse `-X importtime`
+def measure():
+    env = os.environ.copy()
+    env["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    done_proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {', '.join(STARTUP_MODULES)}"],
+                               cwd=base_path, env=env, capture_output=True, text=True)
+    if done_proc.returncode != 0:
+        raise RuntimeError(done_proc.stderr.strip().splitlines()[-1])
+
+    # "import time: self [us] | cumulative | imported package"
+    modules = {}
+    total = 0
+    for line in done_proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip(" ") for part in line.replace("import time:", "|").split("|")]
+        modules[name.strip()] = int(cumulative_us)
+        if not name.startswith(" "):
+            total += int(cumulative_us)
+    return total, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SHUGRPi import-time benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="number of measured runs (the fastest counts)")
+    parser.add_argument("--budget", type=float, default=None, help="maximum startup import time in ms")
+    args = parser.parse_args()
+
+    # first run writes bytecode caches
+    measure()
+    total, modules = min((measure() for _ in range(args.runs)), key=lambda run: run[0])
+
+    print(f"Startup imports: {total / 1000:.1f}ms (fastest of {args.runs} runs)")
+    for name in STARTUP_MODULES:
+        print(f"    {name:<20}{modules.get(name, 0) / 1000:>8.1f}ms")
+
+    failed = False
+    for name in DEFERRED_MODULES:
+        if name in modules:
+            print(f"FAIL: `{name}` is imported at startup ({modules[name] / 1000:.1f}ms)")
+            failed = True
+
+    if args.budget is not None and total / 1000 > args.budget:
+        print(f"FAIL: startup imports took {total / 1000:.1f}ms (budget: {args.budget:.1f}ms)")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
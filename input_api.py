@@ -0,0 +1,292 @@
+"""Input API for the SHUGRPi OS (keyboard, game controllers and joystick hats mapped to ``INPUT_BINDINGS``)"""
+
+from collections import deque
+import threading
+import random
+import pygame
+import time
+from constants import *
+
+# game-controller support is part of pygame-ce's SDL2 API
+try:
+    from pygame._sdl2 import controller
+except ImportError:
+    controller = None
+
+
+# press or release of a logical button (a key of ``INPUT_BINDINGS``)
+class InputEvent:
+    def __init__(self, action, pressed=True, source="key", time=None):
+        self.action = action
+        self.pressed = pressed
+        self.source = source
+        self.time = time
+
+    def __repr__(self):
+        return f"<InputEvent {self.action} {'pressed' if self.pressed else 'released'} ({self.source})>"
+
+
+# translates raw pygame events into ``InputEvent``s
+class InputManager:
+    # axes count as pressed past `axis_press` and as released again below `axis_release` (fractions of the full range)
+    axis_press = 0.6
+    axis_release = 0.4
+
+    def __init__(self, logger, bindings=INPUT_BINDINGS):
+        """
+        Every binding is looked up in a table by its source (key, controller button, hat
+        direction or controller axis), and raw events are dispatched by their type.
+
+        Game controllers are opened with ``pygame._sdl2.controller`` (so the D-pad and face
+        buttons have fixed codes on every pad); other joysticks only provide their hats.
+        """
+        self.logger = logger
+
+        self.keys = {}
+        self.buttons = {}
+        self.hats = {}
+        self.axes = {}
+        for action, binding in bindings.items():
+            for key in binding.get("keys", []):
+                self.keys[key] = action
+            for button in binding.get("buttons", []):
+                self.buttons[button] = action
+            for hat in binding.get("hats", []):
+                self.hats[hat] = action
+            for axis, direction in binding.get("axes", []):
+                self.axes.setdefault(axis, []).append((direction, action))
+
+        # open devices by instance id
+        self.controllers = {}
+        self.joysticks = {}
+
+        # held hat directions and axes, so only changes become events
+        self.hat_state = {}
+        self.axis_state = {}
+
+        self.handlers = {pygame.KEYDOWN: self._key_down,
+                         pygame.KEYUP: self._key_up,
+                         pygame.CONTROLLERBUTTONDOWN: self._button_down,
+                         pygame.CONTROLLERBUTTONUP: self._button_up,
+                         pygame.CONTROLLERAXISMOTION: self._axis_motion,
+                         pygame.JOYHATMOTION: self._hat_motion,
+                         pygame.JOYDEVICEADDED: self._device_added,
+                         pygame.JOYDEVICEREMOVED: self._device_removed}
+
+    def start(self):
+        if controller is not None:
+            controller.init()
+        else:
+            self.logger.warning("InputManager: game controllers are not supported (only joystick hats are used)")
+        self.scan()
+
+    def scan(self):
+        """re-open every connected device (hot-plug events are missed while a game runs)"""
+        for instance_id in list(self.controllers) + list(self.joysticks):
+            self._close(instance_id, False)
+
+        for index in range(pygame.joystick.get_count()):
+            self._open(index, False)
+
+        if self.controllers or self.joysticks:
+            self.logger.info(f"InputManager: {len(self.controllers)} controller(s) and {len(self.joysticks)} joystick(s) connected")
+
+    def translate(self, event):
+        """``InputEvent``s caused by a raw pygame event (most events cause none)"""
+        handler = self.handlers.get(event.type)
+        if handler is None:
+            return []
+
+        # synthetic events carry the time they were posted, everything else is timed when it is taken off the queue
+        input_time = getattr(event, "input_time", None) or time.perf_counter()
+        events = handler(event)
+        for input_event in events:
+            input_event.time = input_time
+        return events
+
+    """devices"""
+    def _open(self, index, log=True):
+        try:
+            if controller is not None and controller.is_controller(index):
+                device = controller.Controller(index)
+                instance_id = device.as_joystick().get_instance_id()
+                devices = self.controllers
+            else:
+                device = pygame.joystick.Joystick(index)
+                instance_id = device.get_instance_id()
+                devices = self.joysticks
+        except pygame.error as e:
+            self.logger.error(f"InputManager: failed to open device {index}: {e}")
+            return
+
+        # devices that are already connected get an added-event as well
+        if instance_id in self.controllers or instance_id in self.joysticks:
+            return
+
+        devices[instance_id] = device
+        if log:
+            self.logger.info(f"InputManager: connected `{device.name if devices is self.controllers else device.get_name()}`")
+
+    def _close(self, instance_id, log=True):
+        device = self.controllers.pop(instance_id, None) or self.joysticks.pop(instance_id, None)
+        self.hat_state.pop(instance_id, None)
+        for key in [key for key in self.axis_state if key[0] == instance_id]:
+            del self.axis_state[key]
+
+        if device is not None:
+            device.quit()
+        if device is not None and log:
+            self.logger.info(f"InputManager: disconnected device {instance_id}")
+
+    def _device_added(self, event):
+        self._open(event.device_index)
+        return []
+
+    def _device_removed(self, event):
+        self._close(event.instance_id)
+        return []
+
+    def quit(self):
+        for instance_id in list(self.controllers) + list(self.joysticks):
+            self._close(instance_id)
+
+    """event translation"""
+    def _key_down(self, event):
+        action = self.keys.get(event.key)
+        return [InputEvent(action)] if action is not None else []
+
+    def _key_up(self, event):
+        action = self.keys.get(event.key)
+        return [InputEvent(action, False)] if action is not None else []
+
+    def _button_down(self, event):
+        action = self.buttons.get(event.button)
+        return [InputEvent(action, True, "controller")] if action is not None else []
+
+    def _button_up(self, event):
+        action = self.buttons.get(event.button)
+        return [InputEvent(action, False, "controller")] if action is not None else []
+
+    def _axis_motion(self, event):
+        events = []
+        value = event.value / 32767
+        for direction, action in self.axes.get(event.axis, []):
+            key = (event.instance_id, event.axis, direction)
+            held = self.axis_state.get(key, False)
+            if not held and value * direction > self.axis_press:
+                self.axis_state[key] = True
+                events.append(InputEvent(action, True, "controller"))
+            elif held and value * direction < self.axis_release:
+                self.axis_state[key] = False
+                events.append(InputEvent(action, False, "controller"))
+        return events
+
+    def _hat_motion(self, event):
+        # game controllers report their D-pad as buttons as well
+        if event.instance_id in self.controllers:
+            return []
+
+        x, y = event.value
+        hats = (HAT_UP if y > 0 else 0) | (HAT_DOWN if y < 0 else 0) | (HAT_RIGHT if x > 0 else 0) | (HAT_LEFT if x < 0 else 0)
+        changed = hats ^ self.hat_state.get(event.instance_id, 0)
+        self.hat_state[event.instance_id] = hats
+
+        events = []
+        for hat, action in self.hats.items():
+            if changed & hat:
+                events.append(InputEvent(action, bool(hats & hat), "hat"))
+        return events
+
+
+# input-to-photon latency measurement
+class InputLatencyMeter:
+    def __init__(self, logger, report_every=100, max_samples=None, on_done=None):
+        """
+        A press counts as shown on the first flip after a simulation step has run with it
+        (``mark_input`` -> ``mark_update`` -> ``mark_flip``), which is when eased motion (like
+        the game wheel turning) first reaches the screen.
+
+        :param max_samples: ``on_done`` is called once this many presses have been measured
+        """
+        self.logger = logger
+        self.report_every = report_every
+        self.max_samples = max_samples
+        self.on_done = on_done
+
+        # input times of presses waiting for a simulation step, and of presses waiting for a flip
+        self.pending = []
+        self.applied = []
+
+        self.samples = deque(maxlen=1000)
+        self.num_samples = 0
+
+    def mark_input(self, event):
+        self.pending.append(event.time)
+
+    def mark_update(self):
+        if self.pending:
+            self.applied.extend(self.pending)
+            self.pending.clear()
+
+    def mark_flip(self):
+        if not self.applied:
+            return
+
+        flip_time = time.perf_counter()
+        for input_time in self.applied:
+            self.samples.append(flip_time - input_time)
+            self.num_samples += 1
+            if self.num_samples % self.report_every == 0:
+                self.report()
+        self.applied.clear()
+
+        if self.max_samples is not None and self.num_samples >= self.max_samples and self.on_done is not None:
+            self.on_done()
+            self.on_done = None
+
+    def report(self):
+        if not self.samples:
+            return
+        samples = sorted(self.samples)
+        average = sum(samples) / len(samples)
+        p50, p95, p99 = [samples[min(len(samples) - 1, int(len(samples) * q))] for q in (.5, .95, .99)]
+        self.logger.info(f"InputManager: input-to-photon latency avg {average * 1000:.1f}ms, p50 {p50 * 1000:.1f}ms, p95 {p95 * 1000:.1f}ms, "
+                         f"p99 {p99 * 1000:.1f}ms, max {samples[-1] * 1000:.1f}ms ({len(samples)} samples)")
+
+
+# synthetic presses for latency benchmarks (posted from a thread, so they land anywhere within a frame)
+class InputInjector:
+    def __init__(self, actions=("LEFT", "RIGHT"), interval=(0.2, 0.4), hold=0.05, bindings=INPUT_BINDINGS, seed=0):
+        """
+        Presses and releases the first key bound to each of ``actions`` in turn, waiting a
+        random (but seeded, so runs are repeatable) time between ``interval`` seconds.
+        """
+        self.keys = [bindings[action]["keys"][0] for action in actions]
+        self.interval = interval
+        self.hold = hold
+        self.random = random.Random(seed)
+
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(name="SHUGRPi Input Injector", target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _run(self):
+        i = 0
+        while not self.stop_event.wait(self.random.uniform(*self.interval)):
+            key = self.keys[i % len(self.keys)]
+            self._post(pygame.KEYDOWN, key)
+            self.stop_event.wait(self.hold)
+            self._post(pygame.KEYUP, key)
+            i += 1
+
+    def _post(self, event_type, key):
+        if pygame.display.get_init():
+            pygame.event.post(pygame.event.Event(event_type, key=key, mod=0, unicode="", scancode=0, input_time=time.perf_counter()))
+
+    def stop(self):
+        self.stop_event.set()
+
+
+__all__ = ["InputEvent", "InputManager", "InputLatencyMeter", "InputInjector"]
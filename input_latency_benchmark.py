@@ -0,0 +1,72 @@
+"""
+Input-latency benchmark for the SHUGRPi OS
+
+Boots ``main.py`` with ``SHUGRPI_INPUT_BENCHMARK`` set, so an ``InputInjector`` presses LEFT/RIGHT
+at seeded random times once the main menu shows and an ``InputLatencyMeter`` reports how long each
+press takes to reach a flipped frame. Both loop orders are measured (input before or after the
+simulation steps). Runs in a temporary directory (logs included), so the save file and the logs are
+left alone. At least one game has to be in ``games/`` for the wheel to turn.
+
+Usage: python input_latency_benchmark.py [--presses N] [--display] [--order {both,input-first,update-first}]
+"""
+
+# import necessary modules
+import subprocess
+import argparse
+import tempfile
+import sys
+import os
+
+base_path = os.path.dirname(os.path.abspath(__file__))
+games_path = os.path.join(base_path, "games")
+
+ORDERS = {"input-first": "1", "update-first": "0"}
+
+
+# boot the OS, let it measure `presses` synthetic presses and return its last latency report
+def measure(order, presses, display=False, timeout=300):
+    env = os.environ.copy()
+    env["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+    env["SHUGRPI_INPUT_BENCHMARK"] = str(presses)
+    env["SHUGRPI_INPUT_FIRST"] = ORDERS[order]
+    if not display:
+        env["SDL_VIDEODRIVER"] = "dummy"
+        env["SDL_AUDIODRIVER"] = "dummy"
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        env["SHUGRPI_LOG_DIR"] = os.path.join(work_dir, "logs")
+        done_proc = subprocess.run([sys.executable, os.path.join(base_path, "main.py")], cwd=work_dir, env=env,
+                                   capture_output=True, text=True, timeout=timeout)
+
+    reports = [line for line in (done_proc.stdout + done_proc.stderr).splitlines() if "input-to-photon latency" in line]
+    if not reports:
+        output = (done_proc.stderr.strip() or done_proc.stdout.strip()).splitlines()
+        raise RuntimeError(f"no latency report (exit code {done_proc.returncode}: {output[-1] if output else 'no output'})")
+    return reports[-1].split("latency ", 1)[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SHUGRPi input-latency benchmark")
+    parser.add_argument("--presses", type=int, default=200, help="number of measured presses per loop order")
+    parser.add_argument("--display", action="store_true", help="use the real display instead of SDL's dummy driver")
+    parser.add_argument("--order", choices=["both", *ORDERS], default="both", help="loop order(s) to measure")
+    args = parser.parse_args()
+
+    # the OS cannot boot into the main menu without games
+    if not os.path.isdir(games_path) or not any(os.path.isdir(os.path.join(games_path, name)) for name in os.listdir(games_path)):
+        print(f"FAIL: no games in `{games_path}` (add at least one game to benchmark the game wheel)")
+        sys.exit(1)
+
+    failed = False
+    for order in ORDERS if args.order == "both" else [args.order]:
+        try:
+            print(f"{order:<14}{measure(order, args.presses, args.display)}")
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            print(f"{order:<14}FAIL: {e}")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
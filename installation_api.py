@@ -1,11 +1,27 @@
 """Game-installation API for the SHUGRPi OS"""
 
-import subprocess
 import threading
 import shutil
 import time
 import sys
 import os
+import re
+import json
+from collections import deque
+from lazy_import import LazyModule
+
+# only needed once an installation runs
+subprocess = LazyModule("subprocess")
+hashlib = LazyModule("hashlib")
+
+
+# directory housing pre-built venv templates
+base_path = os.path.dirname(os.path.abspath(__file__))
+template_path = os.path.join(base_path, "data", "venv_templates")
+template_lock = threading.Lock()
+
+# name of the installation journal inside of a game directory
+JOURNAL_FILE = ".install_journal.json"
 
 
 # check if specified python executable is valid
@@ -28,40 +44,340 @@ def check_python(path, required_version=None):
         return False
 
 
-# subprocess helper
-def run(p, proc_list):
-    process = subprocess.Popen(p, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+# get "major.minor" version of specified python executable
+def get_python_version(path):
+    try:
+        return subprocess.check_output([path, "-c", "import sys;print(f'{sys.version_info.major}.{sys.version_info.minor}')"],
+            stderr=subprocess.STDOUT, text=True, timeout=5).strip()
+    except (subprocess.SubprocessError, OSError):
+        return None
+
+
+# get python executable inside of a venv
+def get_venv_python(venv):
+    if os.name == "nt":
+        return os.path.join(venv, "Scripts", "python.exe")
+    return os.path.join(venv, "bin", "python")
+
+
+# subprocess helper (output is streamed line by line to ``on_line`` from a reader thread)
+def run(p, proc_list, on_line=None):
+    env = os.environ.copy()
+    env["PYTHONUNBUFFERED"] = "1"
+    process = subprocess.Popen(p, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, env=env)
     proc_list.append(process)
+
+    reader = threading.Thread(name=f"`{os.path.basename(p[0])}` Output Reader", target=_read_output, args=(process.stdout, on_line), daemon=True)
+    reader.start()
+
     process.wait()
+    reader.join()
     return process.returncode
 
 
+def _read_output(stream, on_line):
+    # drain the pipe so the process can never block on a full buffer
+    for line in stream:
+        if on_line is not None:
+            on_line(line.rstrip())
+    stream.close()
+
+
+# installation progress (written by the installation thread, read by the UI)
+class InstallProgress:
+    steps = ["Resolving Python", "Creating venv", "Installing dependencies"]
+
+    # pip output patterns
+    _collecting = re.compile(r"^Collecting (\S+)")
+    _satisfied = re.compile(r"^Requirement already satisfied: (\S+)")
+    _downloading = re.compile(r"^\s*Downloading (\S+)(?: \(([\d.]+) (B|bytes|kB|KB|MB|GB)\))?")
+    _cached = re.compile(r"^\s*Using cached (\S+)")
+    _processing = re.compile(r"^Processing (\S+)")
+    _installing = re.compile(r"^Installing collected packages: (.+)")
+    _installed = re.compile(r"^Successfully installed (.+)")
+    _units = {"B": 1, "bytes": 1, "kB": 1000, "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3}
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+        self.step = 0
+        self.step_times = {}
+        self.step_start = None
+
+        self.collected = 0
+        self.downloaded = 0
+        self.installing = 0
+        self.installed = 0
+        self.packages = []
+        self.bytes = 0
+
+        self.tail = deque(maxlen=10)
+
+    """steps and timing"""
+    def start_step(self, step):
+        with self.lock:
+            self.step = step
+            self.step_start = time.perf_counter()
+
+    def end_step(self):
+        with self.lock:
+            if self.step_start is None:
+                return 0.0
+            duration = time.perf_counter() - self.step_start
+            self.step_times[self.step] = duration
+            self.step_start = None
+            return duration
+
+    def get_step_name(self, step=None):
+        step = self.step if step is None else step
+        if 1 <= step <= len(self.steps):
+            return self.steps[step - 1]
+        return ""
+
+    def get_summary(self):
+        with self.lock:
+            times = [f"{self.get_step_name(step)}: {duration:.2f}s" for step, duration in sorted(self.step_times.items())]
+        return ", ".join(times)
+
+    """pip output"""
+    def parse_line(self, line):
+        with self.lock:
+            self.tail.append(line)
+
+            if self._collecting.match(line) or self._satisfied.match(line):
+                self.collected += 1
+                return
+
+            match = self._downloading.match(line)
+            if match:
+                # metadata-only downloads (used while resolving) are not packages
+                if not match.group(1).endswith(".metadata"):
+                    self.downloaded += 1
+                if match.group(2):
+                    self.bytes += int(float(match.group(2)) * self._units[match.group(3)])
+                return
+
+            if self._cached.match(line):
+                self.downloaded += 1
+                return
+
+            # local archives are collected and "downloaded" in one line
+            if self._processing.match(line):
+                self.collected += 1
+                self.downloaded += 1
+                return
+
+            match = self._installing.match(line)
+            if match:
+                self.installing = len(match.group(1).split(","))
+                return
+
+            match = self._installed.match(line)
+            if match:
+                self.packages = match.group(1).split()
+                self.installed = len(self.packages)
+
+    """UI helpers"""
+    def get_label(self):
+        return f"Installing ({self.step}/{len(self.steps)})..."
+
+    def get_detail(self):
+        with self.lock:
+            if self.step != 3:
+                return ""
+            if self.installed:
+                return f"Installed {self.installed} pkgs"
+            if self.installing:
+                return f"Installing {self.installing} pkgs"
+            if self.collected:
+                return f"Got {self.downloaded}/{self.collected} ({format_bytes(self.bytes)})"
+            return "Resolving..."
+
+
+# check if a game has an unfinished installation
+def is_install_pending(path):
+    return os.path.exists(os.path.join(path, JOURNAL_FILE))
+
+
+# get hash of a file's contents (None if missing)
+def get_file_hash(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+# on-disk record of completed installation steps (lets a restarted launcher resume)
+class InstallJournal:
+    def __init__(self, path):
+        self.file = os.path.join(path, JOURNAL_FILE)
+        self.data = self.load()
+
+    def load(self):
+        if os.path.exists(self.file):
+            try:
+                with open(self.file, "r") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def exists(self):
+        return os.path.exists(self.file)
+
+    def get(self, k, default=None):
+        return self.data.get(k, default)
+
+    def update(self, **kwargs):
+        self.data.update(kwargs)
+        self.save()
+
+    def save(self):
+        # write-then-rename so a crash never leaves a half-written journal
+        temp = self.file + ".tmp"
+        with open(temp, "w") as f:
+            json.dump(self.data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.file)
+
+    def clear(self):
+        self.data = {}
+        if os.path.exists(self.file):
+            os.remove(self.file)
+
+
+# pre-built, pip-equipped venvs that game venvs are cloned from
+class VenvTemplates:
+    def __init__(self, logger, path=template_path):
+        self.logger = logger
+        self.path = path
+
+    def get_template(self, python):
+        version = get_python_version(python)
+        if version is None:
+            return None
+
+        # one template per interpreter (pyenv and system pythons of the same version differ)
+        key = hashlib.sha1(os.path.realpath(python).encode()).hexdigest()[:8]
+        return os.path.join(self.path, f"python{version}-{key}")
+
+    def is_valid(self, template):
+        if template is None:
+            return False
+        return os.path.exists(os.path.join(template, "pyvenv.cfg")) and os.path.exists(get_venv_python(template))
+
+    def build(self, python, proc_list, on_line=None):
+        template = self.get_template(python)
+        if template is None:
+            return None
+
+        with template_lock:
+            if self.is_valid(template):
+                return template
+
+            # build next to the final location, then move it into place
+            temp = template + ".tmp"
+            if os.path.exists(temp):
+                shutil.rmtree(temp)
+            os.makedirs(self.path, exist_ok=True)
+
+            self.logger.info(f"Building venv template in `{template}`...")
+            if run([python, "-m", "venv", "--prompt", ".venv", temp], proc_list, on_line):
+                self.logger.error(f"Failed to build venv template in `{template}`")
+                shutil.rmtree(temp, ignore_errors=True)
+                return None
+
+            if os.path.exists(template):
+                shutil.rmtree(template)
+            self._fix_paths(temp, temp, template)
+            os.replace(temp, template)
+
+        return template
+
+    def clone(self, template, venv):
+        shutil.copytree(template, venv, symlinks=True, copy_function=self._link_or_copy)
+        self._fix_paths(venv, template, venv)
+
+    def _link_or_copy(self, src, dst):
+        # hardlinks cost no data copy; fall back to a real copy (e.g. across filesystems)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+    def _fix_paths(self, venv, old_path, new_path):
+        old_path = os.fsencode(old_path)
+        new_path = os.fsencode(new_path)
+
+        # only pyvenv.cfg and the scripts (activate, pip shebangs) mention the venv's own path
+        files = [os.path.join(venv, "pyvenv.cfg")]
+        scripts = os.path.dirname(get_venv_python(venv))
+        files.extend(os.path.join(scripts, f) for f in os.listdir(scripts))
+
+        for file in files:
+            if os.path.islink(file) or not os.path.isfile(file):
+                continue
+            with open(file, "rb") as f:
+                content = f.read()
+
+            # leave binaries (e.g. Windows launchers) alone
+            if old_path not in content or b"\0" in content:
+                continue
+
+            # write a new file instead of editing in place so hardlinks to the template are left intact
+            temp = file + ".tmp"
+            with open(temp, "wb") as f:
+                f.write(content.replace(old_path, new_path))
+            shutil.copymode(file, temp)
+            os.replace(temp, file)
+
+
+# format byte count for display
+def format_bytes(num):
+    for unit in ["B", "kB", "MB"]:
+        if num < 1000:
+            return f"{num:.0f}{unit}" if unit == "B" else f"{num:.1f}{unit}"
+        num /= 1000
+    return f"{num:.1f}GB"
+
+
 # installation object
 class Installation:
-    def __init__(self, game, logger, internet_connection):
+    def __init__(self, game, logger, network):
         self.game = game
         self.logger = logger
-        self.internet_connection = internet_connection
+        self.network = network
 
         self.name = game.name
         self.path = game.root_path
         self.venv = os.path.join(self.path, ".venv")
         self.requirements = game.requirements
 
-        self._remove_venv()
+        # resume from the journal if a previous launcher died mid-install; otherwise start clean
+        self.journal = InstallJournal(self.path)
+        self.resuming = self.journal.exists()
+        if not self.resuming:
+            self._remove_venv()
 
         self.python = None
         self.python_version = self.game.python_version or ""
 
         self.ready = False
         self.complete = False
+        self.suspended = False
         self.step = 0
+        self.progress = InstallProgress()
+        self.templates = VenvTemplates(self.logger)
 
         # the conditions required to be True before installation
-        conditions = [not os.path.exists(self.venv)]
+        conditions = [not os.path.exists(self.venv) or self.resuming]
         if False not in conditions:
             self.ready = True
-            self.logger.info(f"Attempting to install `{self.name}`...")
+            if self.resuming:
+                self.logger.info(f"Resuming installation of `{self.name}`...")
+            else:
+                self.logger.info(f"Attempting to install `{self.name}`...")
 
         if self.requirements:
             if not os.path.exists(self.requirements):
@@ -143,44 +459,122 @@ class Installation:
 
     def _create_venv(self, python):
         self.logger.info(f"Creating venv in `{self.venv}`...")
+
+        # fast path: clone a pre-built template (built on first use)
+        template = self.templates.get_template(python)
+        if not self.templates.is_valid(template):
+            template = self.templates.build(python, self.processes, self.progress.parse_line)
+        if template is not None:
+            try:
+                self.templates.clone(template, self.venv)
+                self.logger.info(f"Cloned venv from `{template}`")
+                return
+            except (OSError, shutil.Error) as e:
+                self.logger.warning(f"Failed to clone venv template: {e}")
+                self._remove_venv()
+
+        # slow path: create venv from scratch
         try:
             proc = [python, "-m", "venv", self.venv]
-            if run(proc, self.processes):
+            if run(proc, self.processes, self.progress.parse_line):
                 raise subprocess.SubprocessError
         except subprocess.SubprocessError:
             self.ready = False
             self.logger.error(f"Failed to create venv in `{self.venv}`")
 
     def _install_dependencies(self, python):
-        if self.internet_connection:
+        if self.network.has_internet():
             self.logger.info(f"Installing dependencies for `{self.name}`...")
             try:
-                proc = [python, "-m", "pip", "install", "-r", self.requirements]
-                if run(proc, self.processes):
+                proc = [python, "-m", "pip", "install", "--progress-bar", "off", "-r", self.requirements]
+                if run(proc, self.processes, self.progress.parse_line):
                     raise subprocess.SubprocessError
             except subprocess.SubprocessError:
-                self.logger.error(f"Failed to install dependencies for `{self.name}`")
                 self.ready = False
+                if self.suspended:
+                    return
+                self.logger.error(f"Failed to install dependencies for `{self.name}`")
+                for line in self.progress.tail:
+                    self.logger.error(f"pip: {line}")
         else:
             self.logger.error(f"Internet connection required to install dependencies for `{self.name}`")
             self.ready = False
 
+    def _start_step(self, step):
+        self.step = step
+        self.progress.start_step(step)
+
+    def _end_step(self):
+        duration = self.progress.end_step()
+        self.logger.info(f"`{self.name}` step {self.step} ({self.progress.get_step_name()}) took {duration:.2f}s")
+
+    """resume helpers (verify journaled steps instead of redoing them)"""
+    def _resume_python(self):
+        python = self.journal.get("python")
+        if python and get_python_version(python) == self.journal.get("python_version"):
+            self.logger.info(f"Verified Python at `{python}` from previous installation")
+            return python
+        return None
+
+    def _resume_venv(self):
+        if self.journal.get("venv") and get_python_version(get_venv_python(self.venv)) == self.journal.get("python_version"):
+            self.logger.info(f"Verified existing venv in `{self.venv}`")
+            return True
+        self._remove_venv()
+        return False
+
+    def _resume_dependencies(self, python):
+        # pip journals nothing per package, so a resumed install checks what is missing from the venv (nothing is installed)
+        if not self.resuming:
+            return False
+        try:
+            proc = [python, "-m", "pip", "install", "--dry-run", "--quiet", "--report", "-", "-r", self.requirements]
+            report = json.loads(subprocess.check_output(proc, stderr=subprocess.DEVNULL, text=True, timeout=120))
+        except (subprocess.SubprocessError, OSError, ValueError):
+            return False
+
+        missing = report.get("install", [])
+        if missing:
+            self.logger.info(f"{len(missing)} package(s) for `{self.name}` are missing from the previous installation")
+            return False
+        self.logger.info(f"Verified dependencies for `{self.name}` from previous installation")
+        return True
+
     def _handle_processes(self):
-        self.step = 1
-        self.python = self._get_python(self.python_version)
+        # mark the game as mid-install before touching anything on disk
+        self.journal.update(name=self.name)
+
+        self._start_step(1)
+        self.python = self._resume_python() or self._get_python(self.python_version)
+        if self.python is None:
+            self.ready = False
+        if self.ready and not self.complete:
+            self.journal.update(python=self.python, python_version=get_python_version(self.python))
+        self._end_step()
         time.sleep(1)
         if self.ready and not self.complete:
-            self.step = 2
-            self._create_venv(self.python)
+            self._start_step(2)
+            if not self._resume_venv():
+                self._create_venv(self.python)
+                if self.ready and not self.complete:
+                    self.journal.update(venv=True)
+            self._end_step()
         time.sleep(1)
         if self.ready and self.requirements is not None and not self.complete:
-            self.step = 3
-            self._install_dependencies(self.python)
+            self._start_step(3)
+            if not self._resume_dependencies(get_venv_python(self.venv)):
+                # pip skips whatever a previous attempt already installed
+                self._install_dependencies(get_venv_python(self.venv))
+                if self.ready and not self.complete:
+                    self.journal.update(dependencies=True, requirements_hash=get_file_hash(self.requirements),
+                                        packages=self.progress.packages)
+            self._end_step()
 
         if not self.complete:
             if self.ready:
+                self.journal.clear()
                 self.complete = True
-                self.logger.info(f"Successfully installed `{self.name}`")
+                self.logger.info(f"Successfully installed `{self.name}` ({self.progress.get_summary()})")
             else:
                 if self.step == 3:
                     self._remove_venv()
@@ -191,10 +585,10 @@ class Installation:
         self.complete = True
 
         if not from_thread:
-            # kill dependencies process if existing
-            if len(self.processes) == 2:
-                if self.processes[-1].returncode is None:
-                    self.processes[-1].terminate()
+            # kill any process still running
+            for process in self.processes:
+                if process.poll() is None:
+                    process.terminate()
 
             # stop process handling
             self.process_thread.join()
@@ -202,8 +596,22 @@ class Installation:
             # remove venv folder
             self._remove_venv()
 
+        self.journal.clear()
         self.logger.error(f"Failed to install `{self.name}`")
 
+    def suspend(self):
+        self.logger.info(f"Suspending `{self.name}` installation (will resume on next start)...")
+        self.suspended = True
+        self.complete = True
+
+        # kill any process still running
+        for process in self.processes:
+            if process.poll() is None:
+                process.terminate()
+
+        # stop process handling (venv and journal are kept)
+        self.process_thread.join()
+
     def _remove_venv(self):
         if os.path.exists(self.venv):
             shutil.rmtree(self.venv)
@@ -213,4 +621,4 @@ class Installation:
         self.process_thread.start()
 
 
-__all__ = ["Installation"]
+__all__ = ["Installation", "InstallProgress", "InstallJournal", "VenvTemplates", "is_install_pending"]
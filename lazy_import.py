@@ -0,0 +1,26 @@
+"""Deferred module loading for the SHUGRPi OS"""
+
+import importlib
+
+
+# module that is only imported the first time one of its attributes is used
+class LazyModule:
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = importlib.import_module(self._name)
+        self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        module = self._module or self._load()
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+__all__ = ["LazyModule"]
@@ -1,116 +1,301 @@
 """Linux API for the SHUGRPi Operating System"""
 
-import subprocess
+import threading
+import time
+from lazy_import import LazyModule
+
+# only needed once a command runs
+subprocess = LazyModule("subprocess")
+futures = LazyModule("concurrent.futures")
+
+
+# result of a finished command
+class CommandResult:
+    def __init__(self, proc, code, stdout="", stderr="", duration=0.0, timed_out=False):
+        self.proc = proc
+        self.code = code
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duration = duration
+        self.timed_out = timed_out
+
+
+# result code of a command the worker pool failed to run (-1 means the command is not available on this device)
+RUNNER_ERROR = -2
+
+
+# asynchronous command runner (commands run on worker pools and never block the UI)
+class CommandRunner:
+    def __init__(self, logger, max_workers=2, max_background_workers=2):
+        """
+        Short, interactive commands (Wi-Fi, time, power) and long background jobs (git fetches
+        and clones) get separate pools, so a user's command never waits behind a download.
+        """
+        self.logger = logger
+        self.max_workers = max_workers
+        self.max_background_workers = max_background_workers
+        self.pool = None
+        self.background_pool = None
+        self.poster = None
+
+    def set_poster(self, poster):
+        """``poster(callback, result)`` hands completions over to the main loop"""
+        self.poster = poster
+
+    def submit(self, proc, timeout=30, callback=None, on_line=None, cwd=None, background=False):
+        """
+        Run ``proc`` on a worker pool.
+
+        :param timeout: seconds before the command is killed (None to wait forever)
+        :param callback: called with the ``CommandResult`` once finished (on the main loop if a poster is set)
+        :param on_line: called with each line of stdout as it arrives (on the worker thread)
+        :param background: run on the pool for long jobs instead of the interactive one
+        :return: future resolving to a ``CommandResult``
+        """
+        return self.submit_func(self.execute, proc, timeout, on_line, cwd, callback=callback, background=background)
+
+    def submit_func(self, func, *args, callback=None, background=False):
+        """run ``func(*args)`` on a worker pool (for multi-command sequences)"""
+        if background:
+            if self.background_pool is None:
+                self.background_pool = futures.ThreadPoolExecutor(max_workers=self.max_background_workers,
+                                                                  thread_name_prefix="SHUGRPi Background Command")
+            pool = self.background_pool
+        else:
+            if self.pool is None:
+                self.pool = futures.ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="SHUGRPi Command")
+            pool = self.pool
+        future = pool.submit(func, *args)
+        if callback is not None:
+            future.add_done_callback(lambda f: self._dispatch(callback, f))
+        return future
+
+    def resolve(self, value, callback=None):
+        """already-finished future (for commands that never need to run)"""
+        future = futures.Future()
+        future.set_result(value)
+        if callback is not None:
+            self._dispatch(callback, future)
+        return future
+
+    def execute(self, proc, timeout=30, on_line=None, cwd=None):
+        """run ``proc`` on the calling thread"""
+        start = time.monotonic()
+        try:
+            process = subprocess.Popen(proc, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1, cwd=cwd)
+        except OSError as e:
+            return CommandResult(proc, 127, stderr=str(e), duration=time.monotonic() - start)
+
+        # enforce timeout
+        timed_out = threading.Event()
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, lambda: (timed_out.set(), process.kill()))
+            timer.daemon = True
+            timer.start()
+
+        # stderr is drained on its own thread so neither pipe can fill up
+        stderr_lines = []
+        stderr_reader = threading.Thread(target=lambda: stderr_lines.extend(process.stderr), daemon=True)
+        stderr_reader.start()
+
+        stdout_lines = []
+        for line in process.stdout:
+            stdout_lines.append(line)
+            if on_line is not None:
+                on_line(line.rstrip())
+
+        process.wait()
+        stderr_reader.join()
+        if timer is not None:
+            timer.cancel()
+
+        if timed_out.is_set():
+            self.logger.warning(f"Command `{' '.join(proc)}` timed out after {timeout}s")
+
+        return CommandResult(proc, process.returncode, "".join(stdout_lines), "".join(stderr_lines),
+                             time.monotonic() - start, timed_out.is_set())
+
+    def post(self, callback, result):
+        """call ``callback(result)`` on the main loop (or right away without a poster)"""
+        if self.poster is not None:
+            self.poster(callback, result)
+        else:
+            callback(result)
+
+    def _dispatch(self, callback, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            self.logger.error(f"Command failed: {e}")
+            result = CommandResult(None, RUNNER_ERROR, stderr=str(e))
+
+        self.post(callback, result)
+
+    def shutdown(self):
+        for pool in [self.pool, self.background_pool]:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+
+# NetworkManager profile used for Wi-Fi
+WIFI_PROFILE = "shugrpi-wifi"
+WIFI_ACTIVATE_TIMEOUT = 30
+
 
 # Linux API
 class Linux:
     def __init__(self, is_shugrpi, logger):
         self.is_shugrpi = is_shugrpi
         self.logger = logger
+        self.runner = CommandRunner(logger)
 
     def set_notification(self, notification):
         self.notification = notification
 
     """set time"""
-    def set_time(self, time):
-        code, error = self._run(["sudo", "timedatectl", "set-time", time])
-        if code == 0:
-            self.logger.info(f"Set time to {time}")
-            self._notify(f"Set time to {time}")
-        elif code > 0:
-            self.logger.error(f"Failed to set the time: {error}")
-            self._notify(f"Failed to set the time: {error}")
-        elif code == -1:
-            self.logger.warning("Cannot set time on non-SHUGRPi device")
-            self._notify("Cannot set time on non-SHUGRPi device")
-        return code
+    def set_time(self, time, callback=None):
+        def on_done(result):
+            if result.code == 0:
+                self.logger.info(f"Set time to {time}")
+                self._notify(f"Set time to {time}")
+            elif result.code == -1:
+                self.logger.warning("Cannot set time on non-SHUGRPi device")
+                self._notify("Cannot set time on non-SHUGRPi device")
+            else:
+                self.logger.error(f"Failed to set the time: {result.stderr}")
+                self._notify(f"Failed to set the time: {result.stderr}")
+            if callback is not None:
+                callback(result)
+
+        return self._run_async(["sudo", "timedatectl", "set-time", time], on_done, timeout=10)
 
     """network commands"""
-    def connect_wifi(self, ssid, psk_key):
+    def connect_wifi(self, ssid, psk_key, callback=None):
+        def on_done(result):
+            if result.code == 0:
+                self.logger.info(f"Connected successfully to `{ssid}` using the password '{len(psk_key) * '*'}'")
+                self._notify(f"Connected successfully to `{ssid}`")
+            elif result.code == -1:
+                self.logger.warning(f"Non-SHUGRPi device cannot connect to `{ssid}`")
+                self._notify(f"Non-SHUGRPi device cannot connect to `{ssid}`")
+            elif result.proc is None and result.code == 1:
+                # rejected before anything ran
+                self._notify(result.stderr)
+            else:
+                self.logger.error(f"Failed to connect to `{ssid}` using the password '{len(psk_key) * '*'}': {result.stderr.strip()}")
+                self._notify(f"Failed to connect to `{ssid}`")
+            if callback is not None:
+                callback(result)
+
         if not len(ssid):
-            self._notify(f"`SSID` field cannot be empty")
-            return -1
+            return self.runner.resolve(CommandResult(None, 1, stderr="`SSID` field cannot be empty"), on_done)
 
         if not len(psk_key):
-            self._notify(f"`Password` field cannot be empty")
-            return -1
+            return self.runner.resolve(CommandResult(None, 1, stderr="`Password` field cannot be empty"), on_done)
 
         self.logger.info(f"Attempting a connection to `{ssid}`...")
         if not self.is_shugrpi:
-            self.logger.warning(f"Non-SHUGRPi device cannot connect to `{ssid}`")
-            self._notify(f"Non-SHUGRPi device cannot connect to `{ssid}`")
-            return -1
-
-        con_name = "shugrpi-wifi"
-        make_profile_proc, _ = self._run(["nmcli", "con", "add", "type", "wifi", "ifname", "con-name", con_name, "ssid", ssid])
-        set_security_proc, _ = self._run(["nmcli", "con", "mod", con_name, "wifi-sec.key-mgmt", "wpa-psk"])
-        set_psk_proc, _ = self._run(["nmcli", "con", "mod", con_name, "wifi-sec.key-psk", psk_key])
-
-        all_procs = [make_profile_proc, set_security_proc, set_psk_proc]
-        if 1 not in all_procs and -1 not in all_procs:
-            self.logger.info(f"Connected successfully to `{ssid}` using the password '{len(psk_key) * '*'}'")
-            self._notify(f"Connected successfully to `{ssid}`")
-            return 0
-        else:
-            self.logger.error(f"Failed to connect to `{ssid}` using the password '{len(psk_key) * '*'}'")
-            self._notify(f"Failed to connect to `{ssid}`")
-            return 1
+            return self.runner.resolve(CommandResult(None, -1), on_done)
 
-    def reload_wifi(self, ssid, psk_key):
-        pass
+        self._notify(f"Connecting to `{ssid}`...")
+        return self.runner.submit_func(self._connect_wifi, ssid, psk_key, callback=on_done)
 
-    def disconnect_wifi(self):
-        pass
+    def _connect_wifi(self, ssid, psk_key):
+        # the whole profile is written by a single nmcli call
+        settings = ["802-11-wireless.ssid", ssid, "wifi-sec.key-mgmt", "wpa-psk", "wifi-sec.psk", psk_key,
+                    "connection.autoconnect", "yes"]
 
-    def ping(self):
-        code = self._call(["ping", "-c", "2", "8.8.8.8"])
-        return code
+        num_profiles = self._count_wifi_profiles()
+        if num_profiles == 1:
+            # reuse the existing profile
+            created = False
+            result = self.runner.execute(["nmcli", "con", "mod", "id", WIFI_PROFILE, *settings], timeout=15)
+        else:
+            # clear out duplicates left behind by older versions
+            if num_profiles > 1:
+                self.runner.execute(["nmcli", "con", "delete", "id", WIFI_PROFILE], timeout=15)
+            created = True
+            result = self.runner.execute(["nmcli", "con", "add", "type", "wifi", "ifname", "*", "con-name", WIFI_PROFILE, *settings], timeout=15)
 
-    """git commands"""
-    def git_clone(self, repo="https://github.com/Stormwrecker/shugrpi_os_master.git"):
-        return self._call(["git", "clone", repo])
+        if result.code != 0:
+            return result
 
-    def git_fetch(self):
-        return self._call(["git", "fetch", "origin"])
+        # activate and report the real outcome
+        result = self.runner.execute(["nmcli", "--wait", str(WIFI_ACTIVATE_TIMEOUT), "con", "up", "id", WIFI_PROFILE],
+                                     timeout=WIFI_ACTIVATE_TIMEOUT + 5)
+        if result.code != 0 and created:
+            # don't leave a profile behind that never worked
+            self.runner.execute(["nmcli", "con", "delete", "id", WIFI_PROFILE], timeout=15)
+        return result
 
-    def git_change_branch(self, branch="origin/main"):
-        if branch in ["origin/main", "catalog/games"]:
-            return self._call(["git", "reset", "--hard", branch])
-        else:
-            return -1
+    def _is_wifi_active(self):
+        result = self.runner.execute(["nmcli", "-t", "-f", "NAME", "con", "show", "--active"], timeout=15)
+        return result.code == 0 and WIFI_PROFILE in result.stdout.splitlines()
 
-    def git_partial_clone(self, repo):
-        clone_proc = self._call(["git", "clone", "--filter=blob:none", "--no-checkout", repo])
-        chdir_proc = self._call(["cd", repo])
-        if clone_proc == 0 and chdir_proc == 0:
+    def _count_wifi_profiles(self):
+        result = self.runner.execute(["nmcli", "-t", "-f", "NAME", "con", "show"], timeout=15)
+        if result.code != 0:
             return 0
-        elif 1 in [clone_proc, chdir_proc]:
-            return 1
-        else:
-            return -1
+        return sum(1 for name in result.stdout.splitlines() if name == WIFI_PROFILE)
+
+    def reload_wifi(self, ssid, psk_key, callback=None):
+        if not ssid or not self.is_shugrpi:
+            return self.runner.resolve(CommandResult(None, -1), callback)
 
-    def git_sparse_init(self):
-        return self._call(["git", "sparse", "-checkout", "init", "--cone"])
+        def reload():
+            # an existing profile autoconnects by itself (re-activating it would drop the link)
+            if self._is_wifi_active():
+                return CommandResult(None, 0)
+            if self._count_wifi_profiles():
+                self.logger.info(f"Waiting for `{ssid}` to autoconnect")
+                return CommandResult(None, 0)
+            self.logger.info(f"Reconnecting to `{ssid}`...")
+            return self._connect_wifi(ssid, psk_key)
 
-    def git_partial_pull(self):
-        return self._call(["git", "sparse-checkout", "set", "catalog/games", "catalog/titles.json"])
+        return self.runner.submit_func(reload, callback=callback)
 
-    def git_check_updates(self):
-        return self._run(["git", "diff", "--quiet", "main", "origin/main"])
+    def disconnect_wifi(self, callback=None):
+        return self._run_async(["nmcli", "con", "down", "id", WIFI_PROFILE], callback, timeout=15)
 
-    def git_pull(self):
-        return self._call(["git", "pull"])
+    def ping(self, callback=None):
+        return self._run_async(["ping", "-c", "2", "8.8.8.8"], callback, timeout=5)
+
+    """git commands"""
+    def git_clone(self, repo="https://github.com/Stormwrecker/shugrpi_os_master.git", callback=None):
+        return self._run_async(["git", "clone", repo], callback, timeout=None, background=True)
+
+    def git_fetch(self, callback=None):
+        return self._run_async(["git", "fetch", "origin"], callback, timeout=300, background=True)
+
+    def git_change_branch(self, branch="origin/main", callback=None):
+        if branch in ["origin/main", "catalog/games"]:
+            return self._run_async(["git", "reset", "--hard", branch], callback, timeout=60, background=True)
+        else:
+            return self.runner.resolve(CommandResult(None, -1), callback)
+
+    def git_check_updates(self, callback=None):
+        return self._run_async(["git", "diff", "--quiet", "main", "origin/main"], callback, timeout=60, background=True)
+
+    def git_pull(self, callback=None):
+        return self._run_async(["git", "pull"], callback, timeout=300, background=True)
 
     """power commands"""
     def power_off(self):
+        # runs during shutdown when there are no more frames to stall
         self._run(["sudo", "poweroff"])
 
-    def reboot(self):
+    def reboot(self, callback=None):
         if self.is_shugrpi:
             self.logger.info("Rebooting OS...")
-        self._run(["pkill", "Xorg"])
+        return self._run_async(["pkill", "Xorg"], callback, timeout=10)
 
     """runners"""
+    def _run_async(self, proc, callback=None, timeout=30, on_line=None, cwd=None, background=False):
+        if self.is_shugrpi:
+            return self.runner.submit(proc, timeout, callback, on_line, cwd, background)
+        return self.runner.resolve(CommandResult(proc, -1), callback)
+
     def _call(self, proc):
         if self.is_shugrpi:
             return subprocess.call(proc) == 0
@@ -126,16 +311,8 @@ class Linux:
     def _notify(self, msg):
         self.notification.reset(msg)
 
+    def quit(self):
+        self.runner.shutdown()
 
-"""unused code"""
-
-CATALOG_PATH = "/opt/catalog-repo"
-
-def git(*args):
-    subprocess.run(["git", *args], cwd=CATALOG_PATH, check=True)
-
-def update_catalog():
-    git("fetch", "origin")
-    git("reset", "--hard", "origin/main")
 
-__all__ = ["Linux"]
+__all__ = ["Linux", "CommandRunner", "CommandResult"]
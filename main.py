@@ -6,18 +6,26 @@ Code and Assets by Stormwrecker
 All Rights Reserved
 """
 
+# boot clock starts before anything else is imported
+import time
+boot_start = time.perf_counter()
+
 # get necessary utilities
 from utils import *
 from constants import *
 from linux_api import *
 from installation_api import *
+from update_api import *
 from virtual_keyboard import *
+from input_api import *
 import os
 import sys
 
 # startup message
 logger = init_logger()
 logger.info(f"SHUGRPi Operating System v{VERSION}")
+boot_timeline = BootTimeline(logger, boot_start)
+boot_timeline.lap("imports")
 
 # initialize Compatibilty Manager
 c = CompatibilityManager(logger)
@@ -26,8 +34,15 @@ is_shugrpi, base_path, os.environ = c.init()
 # initialize Linux API
 linux = Linux(is_shugrpi, logger)
 
+# apply a downloaded update before anything else starts
+updater = UpdateService(linux.runner, logger, base_path)
+if is_shugrpi and updater.apply_pending():
+    logger.info("Restarting into the updated OS...")
+    os.execv(sys.executable, [sys.executable] + sys.argv)
+
 # setup global data manager
 dm = DataManager(logger)
+boot_timeline.lap("system")
 
 # import pygame
 import pygame
@@ -43,42 +58,27 @@ else:
     is_ce = False
 
 # import other modules
-import subprocess
-import time
 import json
 import math
 import random
 from shutil import copy, rmtree
+from collections import deque
+from lazy_import import LazyModule
+
+# only needed once a game launches
+subprocess = LazyModule("subprocess")
 
 
 # initialize pygame with necessary setups
-def init_pygame():
-    os.environ["SDL_AUDIODRIVER"] = "dummy"
-    pygame.init()
+def init_pygame(profile):
+    # only the subsystems the OS uses (pygame.init() would probe an audio driver before init_mixer does)
+    pygame.display.init()
+    pygame.font.init()
+    pygame.joystick.init()
     logger.info("Initialized pygame-ce")
-    active_driver = None
-
-    # setup audio
-    try:
-        pygame.mixer.init()
-        active_driver = pygame.mixer.get_driver()
-        logger.info(f"Using audio driver: {active_driver}")
-        return active_driver
-
-    except Exception as e:
-        drivers = ["wasapi", "alsa", "dummy"]
-        for driver in drivers:
-            try:
-                os.environ["SDL_AUDIODRIVER"] = driver
-                pygame.mixer.quit()
-                pygame.mixer.init()
-                active_driver = driver
-                logger.info(f"Trying audio driver: {active_driver}")
-                break
-            except Exception as e:
-                active_driver = None
-                logger.error(f"Driver not available: {driver}")
 
+    # setup audio (opened once, with the cached driver)
+    active_driver = init_mixer(logger, profile)
     if active_driver:
         logger.info(f"Using audio driver: {active_driver}")
     else:
@@ -88,7 +88,24 @@ def init_pygame():
 
 
 # initialize pygame
-audio_driver = init_pygame()
+mixer_profile = {**DEFAULT_MIXER, **dm.data["mixer"]}
+audio_driver = init_pygame(mixer_profile)
+boot_timeline.lap("pygame")
+
+# input profile (input_latency_benchmark.py asks for a number of synthetic presses to measure instead)
+input_profile = {**DEFAULT_INPUT, **dm.data["input"]}
+benchmark_presses = int(os.environ.get("SHUGRPI_INPUT_BENCHMARK", 0))
+if benchmark_presses:
+    input_profile["input_first"] = os.environ.get("SHUGRPI_INPUT_FIRST", "1") == "1"
+
+# finished Linux commands are handed back to the main loop as events
+COMMAND_EVENT = pygame.event.custom_type()
+
+def post_command(callback, result):
+    if pygame.display.get_init():
+        pygame.event.post(pygame.event.Event(COMMAND_EVENT, callback=callback, result=result))
+
+linux.runner.set_poster(post_command)
 
 # create window
 flags = NOFRAME | FULLSCREEN | SCALED if is_shugrpi else NOFRAME
@@ -97,10 +114,12 @@ screen = pygame.display.set_mode((DISPLAY_WIDTH, DISPLAY_HEIGHT), flags)
 window_title = f"SHUGRPi Operating System v{VERSION}"
 pygame.display.set_caption(window_title)
 pygame.display.set_allow_screensaver(False)
+boot_timeline.lap("window")
 
 # load all images
 master_images = preload_images()
 pygame.display.set_icon(master_images["icon"])
+boot_timeline.lap("images")
 
 # current time
 current_time = time.strftime("%H:%M")
@@ -112,15 +131,11 @@ class Curtain(pygame.sprite.Sprite):
         pygame.sprite.Sprite.__init__(self)
         self.color = BLACK
 
-        self.image = pygame.Surface((1, 1)).convert_alpha()
-        self.image = pygame.transform.scale(self.image, (DISPLAY_WIDTH, DISPLAY_HEIGHT))
-        self.rect = self.image.get_rect()
-        self.rect.topleft = (0, 0)
-
-        self.image.fill(self.color)
+        self.overlay = Overlay((0, 0, DISPLAY_WIDTH, DISPLAY_HEIGHT), self.color)
+        self.rect = self.overlay.rect
 
         self.alpha = 255
-        self.image.set_alpha(self.alpha)
+        self.overlay.set_alpha(self.alpha)
 
         self.speed = 20
 
@@ -138,7 +153,7 @@ class Curtain(pygame.sprite.Sprite):
         else:
             if self.alpha == 255:
                 self.flip = True
-        self.image.set_alpha(int(self.alpha))
+        self.overlay.set_alpha(self.alpha)
 
     def fade_to(self, alpha=0, speed=20, color=None):
         self.target_alpha = alpha
@@ -149,29 +164,44 @@ class Curtain(pygame.sprite.Sprite):
 
     def set_color(self, new_color):
         if self.color != new_color:
-            self.image.fill(new_color)
+            self.overlay.set_color(new_color)
             self.color = new_color
 
     def draw(self, display):
-        if self.alpha:
-            display.blit(self.image, self.rect)
+        self.overlay.draw(display)
 
 
 # floating logo in background
 class FloatingLogo(pygame.sprite.Sprite):
+    # rotations are pre-rendered in steps of `angle_step` degrees, at 1/`frame_scale` of the drawn size
+    angle_step = 5
+    frame_scale = 2
+
     def __init__(self):
         pygame.sprite.Sprite.__init__(self)
-        self.original_image = pygame.transform.scale(master_images["logo"], (int(165 * 4), int(165 * 4))).convert_alpha()
+        size = int(165 * 4) // self.frame_scale
+        self.original_image = pygame.transform.scale(master_images["logo"], (size, size)).convert_alpha()
+        self.frames = {}
         self.start_timer = Timer(120)
         self.timer = Timer(240)
         self.wait_timer = Timer(random.randint(180, 240))
         self.reset()
 
+    def _get_frame(self, angle):
+        # rotated logo cropped to its visible pixels (plus the size of the whole rotated image)
+        if angle not in self.frames:
+            rotated = pygame.transform.rotate(self.original_image, angle)
+            bounds = rotated.get_bounding_rect()
+            self.frames[angle] = (rotated.subsurface(bounds).copy(), rotated.get_size(), bounds.topleft)
+        return self.frames[angle]
+
     def reset(self):
-        self.image = self.original_image.copy()
-        self.image = pygame.transform.rotate(self.image, random.randint(-20, 20))
+        angle = round(random.randint(-20, 20) / self.angle_step) * self.angle_step
+        frame, size, offset = self._get_frame(angle)
+        self.image = pygame.transform.scale_by(frame, self.frame_scale)
+        self.offset = (offset[0] * self.frame_scale, offset[1] * self.frame_scale)
 
-        self.rect = self.image.get_rect()
+        self.rect = pygame.Rect(0, 0, size[0] * self.frame_scale, size[1] * self.frame_scale)
         self.rect.center = (random.randint(100, DISPLAY_WIDTH - 100),
                             random.randint(60, DISPLAY_HEIGHT - 60))
         self.floating_x = self.rect.x
@@ -225,9 +255,15 @@ class FloatingLogo(pygame.sprite.Sprite):
         self.floating_y += self.dy * dt
         self.rect.topleft = (self.floating_x, self.floating_y)
 
-    def draw(self, display):
-        if self.alpha:
-            display.blit(self.image, self.rect)
+    def draw(self, display, clip=None):
+        """``clip``: the part of ``display`` that is not covered afterwards"""
+        if int(self.alpha) <= 0:
+            return
+
+        image_rect = self.image.get_rect(topleft=(self.rect.x + self.offset[0], self.rect.y + self.offset[1]))
+        visible_rect = image_rect.clip(display.get_rect() if clip is None else clip)
+        if visible_rect:
+            display.blit(self.image, visible_rect, visible_rect.move(-image_rect.x, -image_rect.y))
 
 
 # page for game menu
@@ -336,6 +372,7 @@ class GameMenu(pygame.sprite.Sprite):
 
         self.game = None
         self.label = Text("", 0, 0, WHITE, 0)
+        self.label_width = 240
 
         self.selected = False
         self.scroll = [0, 0]
@@ -365,16 +402,9 @@ class GameMenu(pygame.sprite.Sprite):
 
     def _get_label(self, game):
         display_name = game.name or ""
-        default_name = DEFAULT_GAME_CONFIG["name"]
-        if len(display_name.split()) > 2:
-            if display_name != default_name:
-                target_character = display_name.find(" ", 9)
-            else:
-                target_character = display_name.find(" ", 7)
-            display_name = display_name[0:target_character] + "\n" + display_name[target_character + 1:]
         temp_size = 30 if len(display_name) <= 10 else 20
 
-        return Text(display_name, self.main_rect.x + 40, self.main_rect.top + 30, WHITE, temp_size)
+        return TextBlock(display_name, self.main_rect.x + 40, self.main_rect.top + 30, self.label_width, temp_size, align="left")
 
     def _get_status(self):
         status = None
@@ -543,6 +573,7 @@ class Game(pygame.sprite.Sprite):
         self.install_in_progress = False
         self.install_step = 0
         self.status_label = Text("", self.rect.centerx, self.rect.centery, WHITE, 8, retro_font, True)
+        self.status_detail_label = Text("", self.rect.centerx, self.rect.centery + 14, WHITE, 6, retro_font, True)
 
         self.update(1, self.index, self.angle, True, [0, 0])
 
@@ -608,16 +639,21 @@ class Game(pygame.sprite.Sprite):
 
         if self.install_in_progress:
             self.status_label.rect.center = self.rect.center
+            self.status_detail_label.rect.center = (self.rect.centerx, self.rect.centery + 14)
 
     def update_before_install(self):
         self.install_in_progress = True
 
-    def update_during_install(self, step):
-        if step != self.install_step:
-            msg = f"Installing ({step}/3)..."
-            self.status_label.set_text(msg)
+    def update_during_install(self, progress):
+        if progress.step != self.install_step:
+            self.status_label.set_text(progress.get_label())
             self.status_label.rect.center = self.rect.center
-            self.install_step = step
+            self.install_step = progress.step
+
+        detail = progress.get_detail()
+        if detail != self.status_detail_label.text:
+            self.status_detail_label.set_text(detail)
+            self.status_detail_label.rect.center = (self.rect.centerx, self.rect.centery + 14)
 
     def update_after_install(self, success):
         self.install_in_progress = False
@@ -653,6 +689,8 @@ class Game(pygame.sprite.Sprite):
             self.gray_surf = pygame.transform.scale(self.original_gray_surf, self.rect.size)
 
     def check_install(self):
+        if is_install_pending(self.root_path):
+            return False
         return (os.path.exists(self.python_exec) and self.use_venv) or not self.use_venv
 
     def prepare_executable(self):
@@ -672,6 +710,7 @@ class Game(pygame.sprite.Sprite):
             self.gray_surf.set_alpha(self.gray_alpha)
             display.blit(self.gray_surf, self.rect)
             self.status_label.draw(display)
+            self.status_detail_label.draw(display)
 
         if not self.install_in_progress and not self.installed:
             display.blit(self.warning_image, (self.rect.right - 35, self.rect.top + 5))
@@ -785,9 +824,9 @@ class GameManager:
                 # check if game has been installed based on venv's presence
                 venv_path = os.path.join(path, d, ".venv")
                 requirements_path = os.path.join(path, d, "requirements.txt")
-                if os.path.exists(venv_path) or not config_data.get("use_venv"):
+                if (os.path.exists(venv_path) and not is_install_pending(os.path.join(path, d))) or not config_data.get("use_venv"):
                     is_installed = True
-                elif not os.path.exists(venv_path) and config_data.get("use_venv"):
+                elif config_data.get("use_venv"):
                     if os.path.exists(requirements_path):
                         config_data["requirements"] = requirements_path
                 config_data["originally_installed"] = is_installed
@@ -834,6 +873,8 @@ class GameManager:
 
 # game wheel object
 class GameWheelUi(UiElement):
+    animated = True
+
     def __init__(self, x, y, w, h, games, group, dm):
         UiElement.__init__(self, None, x, y, 1, 0, group=group)
 
@@ -866,15 +907,8 @@ class GameWheelUi(UiElement):
 
         self.selected = [True, True]
 
-        self.curtain = pygame.Surface((1, 1)).convert_alpha()
-        self.curtain = pygame.transform.scale(self.curtain, (DISPLAY_WIDTH, DISPLAY_HEIGHT - 60))
-        self.curtain_rect = self.curtain.get_rect()
-        self.curtain_rect.topleft = (0, 30)
-
-        self.curtain.fill(DARKER_GRAY)
-
+        self.curtain = Overlay((0, 30, DISPLAY_WIDTH, DISPLAY_HEIGHT - 60), DARKER_GRAY)
         self.curtain_alpha = 0
-        self.curtain.set_alpha(self.curtain_alpha)
 
         self.game_menu_toggled = False
 
@@ -1027,7 +1061,7 @@ class GameWheelUi(UiElement):
     def update(self, dt, col, row):
         # check if selected
         self.check_selected(col, row, dt)
-        self.curtain.set_alpha(int(self.curtain_alpha))
+        self.curtain.set_alpha(self.curtain_alpha)
 
         self.update_scroll(self.selected, dt)
 
@@ -1108,7 +1142,7 @@ class GameWheelUi(UiElement):
         for game in [s for s in sorted_games if s.z_depth >= 2.0]:
             game.draw(display, self.game_menu_toggled)
 
-        display.blit(self.curtain, self.curtain_rect)
+        self.curtain.draw(display)
 
         for game in [s for s in sorted_games if s == self.lowest_game]:
             game.draw(display, self.game_menu_toggled)
@@ -1130,10 +1164,25 @@ class ShugrPiOS:
         self.display_info = pygame.display.Info()
         logger.info("Using video driver: " + pygame.display.get_driver())
 
-        # manager setup
-        self.am = AudioManager(logger, self.is_shugrpi)
+        # manager setup (the network manager is created during the logo)
+        self.am = AudioManager(logger, self.is_shugrpi, mixer_profile)
         self.gm = GameManager(dm)
-        self.nm = NetworkManager(self.linux, dm, logger)
+        self.nm = None
+
+        # input setup (keyboard and game controllers)
+        self.input = InputManager(logger)
+        self.input.start()
+        self.setup_input_actions()
+
+        # handling input before the simulation steps gets it on screen a frame sooner
+        self.input_first = input_profile["input_first"]
+        self.input_latency = None
+        self.input_injector = None
+        if benchmark_presses:
+            self.input_latency = InputLatencyMeter(logger, benchmark_presses, benchmark_presses, self.finish_benchmark)
+            self.input_injector = InputInjector()
+        elif input_profile["measure_latency"]:
+            self.input_latency = InputLatencyMeter(logger)
 
         # time setup
         self.clock = pygame.time.Clock()
@@ -1159,8 +1208,12 @@ class ShugrPiOS:
         self.logo_alpha = 0
         self.logo_img.set_alpha(self.logo_alpha)
 
-        # virtual keyboard
-        self.virtual_keyboard = VirtualKeyboard()
+        self.notification = Notification(None)
+        self.linux.set_notification(self.notification)
+
+        # effects setup
+        self.curtain = Curtain()
+        self.curtain.set_color(DARKER_GRAY)
 
         # text field UI setup
         self.text_fields = {}
@@ -1169,12 +1222,60 @@ class ShugrPiOS:
         self.rooms = {}
         self.ui_managers = {}
 
-        # setup UI for rooms
-        self.setup_game_room()
-        self.setup_clock_room()
-        self.setup_network_room()
-        self.setup_power_room()
+        # installation setup
+        self.installations = {}
+
+        # master phase variable
+        self.master_phase = -2
+
+        # master running variable
+        self.running = True
+        self.running_game = [None, None]
+        self.start_game = False
+
+        # shutdown variables
+        self.return_code = None
+        self.system_shutdown = None
+
+        self.timers["shutdown"] = Timer(240)
+        self.timers["shutdown"].stop()
+        self.will_shutdown = False
+
+        # everything else is set up one stage per frame while the logo shows
+        self.boot_stages = deque([("network", self.setup_network),
+                                  ("keyboard", self.setup_keyboard),
+                                  ("game room", self.setup_game_room),
+                                  ("clock room", self.setup_clock_room),
+                                  ("network room", self.setup_network_room),
+                                  ("power room", self.setup_power_room),
+                                  ("menus", self.setup_menus),
+                                  ("installations", self.resume_installations)])
+        self.booted = False
+
+        boot_timeline.lap("core")
+        logger.info("Initialized SHUGRPi Operating System")
+
+    """ staged boot """
+    def boot_step(self):
+        if self.boot_stages:
+            name, func = self.boot_stages.popleft()
+            boot_timeline.run(name, func)
+
+        if not self.boot_stages and not self.booted:
+            self.booted = True
+            boot_timeline.mark("booted")
+
+    def finish_boot(self):
+        while not self.booted:
+            self.boot_step()
 
+    def setup_network(self):
+        self.nm = NetworkManager(self.linux, dm, logger)
+
+    def setup_keyboard(self):
+        self.virtual_keyboard = VirtualKeyboard()
+
+    def setup_menus(self):
         # universal UI setup
         self.banner_top = pygame.Surface((DISPLAY_WIDTH, 60)).convert()
         self.banner_top.fill(GRAY)
@@ -1186,47 +1287,27 @@ class ShugrPiOS:
         self.banner_bottom_rect = self.banner_bottom.get_rect()
         self.banner_bottom_rect.midbottom = (HALF_DISPLAY_WIDTH, DISPLAY_HEIGHT)
 
+        self.content_rect = pygame.Rect(0, self.banner_top_rect.bottom, DISPLAY_WIDTH, self.banner_bottom_rect.top - self.banner_top_rect.bottom)
+
         self.dialog_menu = DialogMenu(self.screen, WELCOME_MSG, has_ui=True)
-        self.notification = Notification(None)
-        self.linux.set_notification(self.notification)
+
+        # look for updates in the background
+        if self.is_shugrpi:
+            updater.start(lambda commit: self.notification.reset("Update downloaded: restart to install"))
 
         self.game_menu.set_dialog(self.dialog_menu)
 
-        # effects setup
-        self.curtain = Curtain()
-        self.curtain.set_color(DARKER_GRAY)
         self.floating_logo = FloatingLogo()
 
         # create rooms
         self.create_room("games", 0, 0, self.ui_managers["games"])
-        self.create_room("clock", 0, -1, self.ui_managers["clock"])
-        self.create_room("network", 0, -1, self.ui_managers["network"])
-        self.create_room("power", 0, -1, self.ui_managers["power"])
+        self.create_room("clock", 0, -1, self.ui_managers["clock"], [self.colon], animated=False)
+        self.create_room("network", 0, -1, self.ui_managers["network"], self.nm.texts)
+        self.create_room("power", 0, -1, self.ui_managers["power"], animated=False)
 
         self.rm = RoomManager(self.rooms)
         self.current_room = self.rm.current_room
 
-        # installation setup
-        self.installations = {}
-
-        # master phase variable
-        self.master_phase = -2
-
-        # master running variable
-        self.running = True
-        self.running_game = [None, None]
-        self.start_game = False
-
-        # shutdown variables
-        self.return_code = None
-        self.system_shutdown = None
-
-        self.timers["shutdown"] = Timer(240)
-        self.timers["shutdown"].stop()
-        self.will_shutdown = False
-
-        logger.info("Initialized SHUGRPi Operating System")
-
     """ room ui setup """
     def setup_game_room(self):
         ui_group = pygame.sprite.Group()
@@ -1299,9 +1380,14 @@ class ShugrPiOS:
                     # update curtain first
                     self.curtain.update(dt)
 
+                    if self.input_first:
+                        self.events(self.master_phase)
+
                     # run main loop (delta time)
                     while time_accum >= 1 and step <= 50:
                         self.update(SPEED)
+                        if self.input_latency is not None:
+                            self.input_latency.mark_update()
                         time_accum -= 1
                         step += 1
 
@@ -1309,12 +1395,20 @@ class ShugrPiOS:
                     self.check_installations()
 
                     # rest of main loop
-                    self.events(self.master_phase)
+                    if not self.input_first:
+                        self.events(self.master_phase)
                     self.draw()
+                    boot_timeline.mark("first frame")
+
+                    # continue booting behind the logo
+                    if not self.booted:
+                        self.boot_step()
 
                 # while a game is running
                 if self.running_game[1] is not None:
                     # keep app minimally responsive to avoid breakage
+                    for event in pygame.event.get(COMMAND_EVENT):
+                        event.callback(event.result)
                     pygame.event.get()
 
                     if self.running_game[1].poll() is not None:
@@ -1369,9 +1463,15 @@ class ShugrPiOS:
                         self.logo_alpha = 0
                 else:
                     if self.logo_alpha == 0:
+                        self.finish_boot()
                         self.switch_phase(0, dt, True)
                         self.logo_alpha = 0
-                        logger.info("Running main loop")
+                        if self.master_phase == 0:
+                            logger.info("Running main loop")
+                            boot_timeline.mark("main menu")
+                            boot_timeline.report()
+                            if self.input_injector is not None:
+                                self.input_injector.start()
 
         # main menu
         elif self.master_phase == 0:
@@ -1414,14 +1514,34 @@ class ShugrPiOS:
                     self.execute_game()
 
     def events(self, phase):
-        # handle events
+        # handle events (the whole queue every frame: events taken off it and left unhandled would be lost, command completions included)
         for event in pygame.event.get():
 
+            # finished Linux commands
+            if event.type == COMMAND_EVENT:
+                event.callback(event.result)
+                continue
+
             # shutdown
-            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+            if event.type == pygame.QUIT:
                 self.pre_shutdown()
 
-            if event.type == pygame.KEYDOWN:
+            # keys, controller buttons, hats and axes as logical buttons
+            for input_event in self.input.translate(event):
+
+                # held buttons stop repeating
+                if not input_event.pressed:
+                    if phase == 0:
+                        self.virtual_keyboard.handle_release(input_event)
+                    continue
+
+                if input_event.action == "POWER":
+                    self.pre_shutdown()
+
+                self.am.mark_input()
+                if self.input_latency is not None:
+                    self.input_latency.mark_input(input_event)
+
                 if phase == -2:
                     phase = -1
                     self.timers["start"].finished = True
@@ -1430,110 +1550,111 @@ class ShugrPiOS:
                     self.timers["start"].finished = True
 
                 elif phase == 0:
-                    if self.virtual_keyboard.toggled:
-                        self.virtual_keyboard.handle_event(event, self.text_fields)
-                        return
-
-                    # dialog menu
-                    if self.dialog_menu.showing and self.dialog_menu.has_ui:
-                        if event.key in [pygame.K_UP, pygame.K_LEFT]:
-                            self.dialog_menu.um.change_col(-1)
-                        if event.key in [pygame.K_DOWN, pygame.K_RIGHT]:
-                            self.dialog_menu.um.change_col(1)
-                        if event.key == pygame.K_RETURN:
-                            self.dialog_menu.um.action()
-                            self.handle_dialog_output()
-
-                    # dialog menu cancel
-                    if not self.dialog_menu.has_ui:
-                        self.dialog_menu.fade_out()
-
-                    if self.current_room[3] == "games":
-
-                        # game wheel
-                        if self.game_wheel.selected[1] and not self.game_menu.toggled:
-                            # navigation
-                            if event.key == pygame.K_UP:
-                                self.ui_managers["games"].change_row(-1)
-                            if event.key == pygame.K_DOWN:
-                                self.ui_managers["games"].change_row(1)
-                            if event.key == pygame.K_LEFT:
-                                self.game_wheel.update_index(-1, self.am)
-                            if event.key == pygame.K_RIGHT:
-                                self.game_wheel.update_index(1, self.am)
-
-                            # functions
-                            if event.key == pygame.K_RSHIFT:
-                                gw = self.game_wheel
-                                gw.sort_games(self.am)
-                                title = f"Sort By: {gw.sort_names[gw.sort_types[int(gw.sort_index)]]}\nAscending: {not gw.reverse_sort}"
-                                self.dialog_menu.reset(title, True)
-                            if event.key == pygame.K_RETURN:
-                                self.game_menu.game = self.game_wheel.games[self.game_wheel.master_index]
-                                self.game_wheel.selected[0] = False
-                                self.game_menu.toggle()
-
-                        # game menu
-                        elif self.game_menu.toggled:
-                            # navigation
-                            if event.key == pygame.K_UP:
-                                self.game_menu.um.change_row(-1)
-                            if event.key == pygame.K_DOWN:
-                                self.game_menu.um.change_row(1)
-
-                            # functions
-                            if event.key == pygame.K_RETURN:
-                                self.game_wheel.selected[0] = self.game_menu.action()
-                            if event.key == pygame.K_BACKSPACE:
-                                self.game_wheel.selected[0] = True
-                                self.game_menu.toggle()
-
-                        # normal
-                        else:
-                            self.default_ui_nav(event)
-
-                    elif self.current_room[3] == "clock":
-                        if self.hour_ui.selected:
-                            if event.key == pygame.K_UP:
-                                if self.sys_clock.round_clock:
-                                    label = (int(self.hour_ui.label) + 1) % 24
-                                else:
-                                    label = int(self.hour_ui.label) + 1
-                                    if label > 12:
-                                        label = 1
-                                self.hour_ui.change_label(("0" if label < 10 else "") + str(label))
-                            if event.key == pygame.K_DOWN:
-                                if self.sys_clock.round_clock:
-                                    label = (int(self.hour_ui.label) - 1) % 24
-                                else:
-                                    label = int(self.hour_ui.label) - 1
-                                    if label < 1:
-                                        label = 12
-                                self.hour_ui.change_label(("0" if label < 10 else "") + str(label))
-                        elif self.minute_ui.selected:
-                            if event.key == pygame.K_UP:
-                                label = str((int(self.minute_ui.label) + 1) % 60)
-                                self.minute_ui.change_label(("0" if int(label) < 10 else "") + label)
-                            if event.key == pygame.K_DOWN:
-                                label = str((int(self.minute_ui.label) - 1) % 60)
-                                self.minute_ui.change_label(("0" if int(label) < 10 else "") + label)
-                        else:
-                            if event.key == pygame.K_UP:
-                                self.current_room[2].change_row(-1)
-                            if event.key == pygame.K_DOWN:
-                                self.current_room[2].change_row(1)
-
-                        if event.key == pygame.K_LEFT:
-                            self.current_room[2].change_col(-1)
-                        if event.key == pygame.K_RIGHT:
-                            self.current_room[2].change_col(1)
-                        if event.key == pygame.K_RETURN:
-                            self.current_room[2].action()
-                        if event.key == pygame.K_BACKSPACE:
-                            self.switch_room("games")
+                    self.handle_menu_input(input_event)
+
+    """ input utilities """
+    def setup_input_actions(self):
+        # what each logical button does (by input context)
+        room_actions = {"UP": lambda: self.current_room[2].change_row(-1),
+                        "DOWN": lambda: self.current_room[2].change_row(1),
+                        "LEFT": lambda: self.current_room[2].change_col(-1),
+                        "RIGHT": lambda: self.current_room[2].change_col(1),
+                        "A": lambda: self.current_room[2].action(),
+                        "B": lambda: self.switch_room("games")}
+
+        self.input_actions = {"dialog": {"UP": lambda: self.dialog_menu.um.change_col(-1),
+                                         "LEFT": lambda: self.dialog_menu.um.change_col(-1),
+                                         "DOWN": lambda: self.dialog_menu.um.change_col(1),
+                                         "RIGHT": lambda: self.dialog_menu.um.change_col(1),
+                                         "A": self.confirm_dialog},
+                              "game wheel": {"UP": lambda: self.ui_managers["games"].change_row(-1),
+                                             "DOWN": lambda: self.ui_managers["games"].change_row(1),
+                                             "LEFT": lambda: self.game_wheel.update_index(-1, self.am),
+                                             "RIGHT": lambda: self.game_wheel.update_index(1, self.am),
+                                             "SELECT": self.sort_games,
+                                             "A": self.open_game_menu},
+                              "game menu": {"UP": lambda: self.game_menu.um.change_row(-1),
+                                            "DOWN": lambda: self.game_menu.um.change_row(1),
+                                            "A": self.game_menu_action,
+                                            "B": self.close_game_menu},
+                              "clock": room_actions | {"UP": lambda: self.change_clock_value(1),
+                                                       "DOWN": lambda: self.change_clock_value(-1)},
+                              "room": room_actions}
+
+        # START confirms just like A
+        for actions in self.input_actions.values():
+            if "A" in actions:
+                actions["START"] = actions["A"]
+
+    def finish_benchmark(self):
+        self.input_injector.stop()
+        self.pre_shutdown()
+
+    def get_input_context(self):
+        if self.current_room[3] == "games":
+            if self.game_wheel.selected[1] and not self.game_menu.toggled:
+                return "game wheel"
+            elif self.game_menu.toggled:
+                return "game menu"
+        elif self.current_room[3] == "clock":
+            return "clock"
+        return "room"
+
+    def dispatch_input(self, context, event):
+        func = self.input_actions[context].get(event.action)
+        if func is not None:
+            func()
+
+    def handle_menu_input(self, event):
+        if self.virtual_keyboard.toggled:
+            self.virtual_keyboard.handle_event(event, self.text_fields)
+            return
+
+        # dialog menu
+        if self.dialog_menu.showing and self.dialog_menu.has_ui:
+            self.dispatch_input("dialog", event)
+
+        # dialog menu cancel
+        if not self.dialog_menu.has_ui:
+            self.dialog_menu.fade_out()
+
+        self.dispatch_input(self.get_input_context(), event)
+
+    def confirm_dialog(self):
+        self.dialog_menu.um.action()
+        self.handle_dialog_output()
+
+    def sort_games(self):
+        gw = self.game_wheel
+        gw.sort_games(self.am)
+        title = f"Sort By: {gw.sort_names[gw.sort_types[int(gw.sort_index)]]}\nAscending: {not gw.reverse_sort}"
+        self.dialog_menu.reset(title, True)
+
+    def open_game_menu(self):
+        self.game_menu.game = self.game_wheel.games[self.game_wheel.master_index]
+        self.game_wheel.selected[0] = False
+        self.game_menu.toggle()
 
-                    else:
-                        self.default_ui_nav(event)
+    def game_menu_action(self):
+        self.game_wheel.selected[0] = self.game_menu.action()
+
+    def close_game_menu(self):
+        self.game_wheel.selected[0] = True
+        self.game_menu.toggle()
+
+    def change_clock_value(self, step):
+        # hours and minutes are changed in place, otherwise UP and DOWN change rows
+        if self.hour_ui.selected:
+            if self.sys_clock.round_clock:
+                label = (int(self.hour_ui.label) + step) % 24
+            else:
+                label = (int(self.hour_ui.label) + step - 1) % 12 + 1
+            self.hour_ui.change_label(("0" if label < 10 else "") + str(label))
+        elif self.minute_ui.selected:
+            label = str((int(self.minute_ui.label) + step) % 60)
+            self.minute_ui.change_label(("0" if int(label) < 10 else "") + label)
+        else:
+            self.current_room[2].change_row(-step)
 
     def draw(self):
         self.screen.fill(DARKER_GRAY)
@@ -1553,22 +1674,15 @@ class ShugrPiOS:
         elif self.master_phase == 0:
             self.display.fill(DARK_GRAY)
 
-            self.floating_logo.draw(self.display)
-
-            self.rm.clear()
-
-            for _, room in self.rooms.items():
-                if room[0] in self.rm.active_rooms:
-                    room[1].blit(self.banner_top, (self.banner_top_rect.x, self.banner_top_rect.y))
-                    room[1].blit(self.banner_bottom, (self.banner_bottom_rect.x, self.banner_bottom_rect.y))
-
-            for _, room in self.rooms.items():
-                if room[0] in self.rm.active_rooms:
-                    room[2].draw(room[1])
+            # the banners of a room at rest cover the top and bottom of the screen
+            if any(room[0].moving for room in self.rm.visible_rooms):
+                self.floating_logo.draw(self.display)
+            else:
+                self.floating_logo.draw(self.display, self.content_rect)
 
-            self.game_menu.draw(self.rooms["games"][1])
-            self.colon.draw(self.rooms["clock"][1])
-            self.nm.draw(self.rooms["network"][1])
+            self.rm.compose()
+            if self.rm.needs_redraw("games"):
+                self.game_menu.draw(self.rooms["games"][1])
 
             self.rm.draw(self.display)
 
@@ -1590,6 +1704,8 @@ class ShugrPiOS:
 
         # flip screen
         pygame.display.flip()
+        if self.input_latency is not None:
+            self.input_latency.mark_flip()
 
     """ game utilities """
     def fade_to_game(self):
@@ -1652,16 +1768,27 @@ class ShugrPiOS:
         self.game_menu.toggled = True
         self.game_menu.toggle()
 
+        # controllers may have been (dis)connected while the game ran
+        self.input.scan()
+
         self.clock.tick(FPS)
 
     """ installation utilities """
-    def install_game(self):
-        current_game = self.game_wheel.lowest_game
+    def install_game(self, game=None):
+        current_game = game or self.game_wheel.lowest_game
         if current_game.name not in self.installations:
             current_game.update_before_install()
-            self.installations[current_game.name] = Installation(current_game, logger, self.nm.internet_access)
+            self.installations[current_game.name] = Installation(current_game, logger, self.nm)
             self.installations[current_game.name].start()
-            self.game_menu.update_start_game_ui(2)
+            if game is None:
+                self.game_menu.update_start_game_ui(2)
+
+    def resume_installations(self):
+        # pick up installations interrupted by a crash or restart
+        for game in self.game_wheel.games:
+            if game.use_venv and is_install_pending(game.root_path):
+                logger.info(f"Found unfinished installation of `{game.name}`")
+                self.install_game(game)
 
     def check_installations(self):
         for installation in list(self.installations.values()).copy():
@@ -1679,13 +1806,14 @@ class ShugrPiOS:
                 del self.installations[installation.name]
             else:
                 current_game = [g for g in self.game_wheel.games if g.name == installation.name][0]
-                current_game.update_during_install(installation.step)
+                current_game.update_during_install(installation.progress)
 
     def uninstall_game(self):
         current_game = self.game_wheel.lowest_game
         current_game_venv = os.path.join(current_game.root_path, ".venv")
         if os.path.exists(current_game_venv):
             rmtree(current_game_venv)
+            InstallJournal(current_game.root_path).clear()
             self.notification.reset(f"{current_game.name} has been uninstalled")
 
             self.gm = GameManager(dm)
@@ -1742,20 +1870,6 @@ class ShugrPiOS:
                 self.master_phase = new_phase
                 self.am.reset_sounds()
 
-    def default_ui_nav(self, event):
-        if event.key == pygame.K_UP:
-            self.current_room[2].change_row(-1)
-        if event.key == pygame.K_DOWN:
-            self.current_room[2].change_row(1)
-        if event.key == pygame.K_LEFT:
-            self.current_room[2].change_col(-1)
-        if event.key == pygame.K_RIGHT:
-            self.current_room[2].change_col(1)
-        if event.key == pygame.K_RETURN:
-            self.current_room[2].action()
-        if event.key == pygame.K_BACKSPACE:
-            self.switch_room("games")
-
     def handle_dialog_output(self):
         # installation
         if self.dialog_menu.dialog_type == 0:
@@ -1779,8 +1893,8 @@ class ShugrPiOS:
             self.text_fields[k] = v
 
     def _dump_log(self):
-        temp_log_file = os.path.join(base_path, "logs", "temp_session.log")
-        new_log_file = os.path.join(base_path, "logs", "session.log")
+        temp_log_file = os.path.join(temp_dir, "temp_session.log")
+        new_log_file = os.path.join(temp_dir, "session.log")
         copy(temp_log_file, new_log_file)
         quit_logger()
         os.remove(temp_log_file)
@@ -1802,12 +1916,16 @@ class ShugrPiOS:
     def create_ui_manager(self, name, ui_group):
         self.ui_managers[name] = UiManager(ui_group)
 
-    def create_room(self, name, x, y, um=UiManager([UiElement("", 0, 0, 0, 0, group=[])])):
-        new_room = Room(x, y)
+    def create_room(self, name, x, y, um=UiManager([UiElement("", 0, 0, 0, 0, group=[])]), static_items=(), animated=True):
+        new_room = Room(x, y, animated)
+        new_room.set_background([(self.banner_top, self.banner_top_rect), (self.banner_bottom, self.banner_bottom_rect)])
+        new_room.add_static(*static_items)
+        new_room.set_ui_manager(um)
         self.rooms[name] = [new_room, new_room.surf, um, name]
 
     def switch_room(self, name):
         self.current_room = self.rm.switch_to(name)
+        self.nm.set_room_open(name == "network")
         if name == "games":
             self.current_room[2].y_index = 1
         for field in self.text_fields.values():
@@ -1839,20 +1957,31 @@ class ShugrPiOS:
         if self.running_game[1] is not None:
             self.running_game[1].terminate()
 
-        # cancel any ongoing game installations
+        # suspend any ongoing game installations (resumed on next start)
         for installation in self.installations.values():
             if not installation.complete:
-                installation.bailout()
+                installation.suspend()
 
         # quit pygame
         self.running = False
+        if self.am.latency_meter is not None:
+            self.am.latency_meter.report()
+        if self.input_injector is not None:
+            self.input_injector.stop()
+        if self.input_latency is not None:
+            self.input_latency.report()
+        self.input.quit()
         pygame.quit()
 
         # quit managers
-        self.nm.quit()
+        if self.nm is not None:
+            self.nm.quit()
+        updater.stop()
+        self.linux.quit()
 
         # save data
-        dm.update("sort", self.game_wheel.sort_index)
+        if self.booted:
+            dm.update("sort", self.game_wheel.sort_index)
         dm.update("last_timestamp", time.time())
         dm.save()
 
@@ -0,0 +1,398 @@
+"""Network API for the SHUGRPi OS"""
+
+import subprocess
+import threading
+import shutil
+import socket
+import select
+import errno
+import time
+import re
+import os
+
+
+"""Event sources (tell the monitor that links/addresses may have changed)"""
+
+# rtnetlink multicast groups
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+
+
+# link/address changes straight from the kernel (Linux only, no process needed)
+class NetlinkEventSource:
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+        self.sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR))
+        self.thread = None
+
+    def start(self, callback):
+        self.thread = threading.Thread(name="SHUGRPi Netlink Listener", target=self._listen, args=(callback,), daemon=True)
+        self.thread.start()
+
+    def _listen(self, callback):
+        while True:
+            try:
+                if not self.sock.recv(65536):
+                    break
+            except OSError:
+                break
+            callback()
+
+    def stop(self):
+        self.sock.close()
+
+
+# connectivity changes reported by NetworkManager's `nmcli monitor`
+class NmcliEventSource:
+    def __init__(self):
+        self.process = None
+        self.thread = None
+
+    def start(self, callback):
+        self.process = subprocess.Popen(["nmcli", "monitor"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1)
+        self.thread = threading.Thread(name="SHUGRPi nmcli Listener", target=self._listen, args=(callback,), daemon=True)
+        self.thread.start()
+
+    def _listen(self, callback):
+        for _ in self.process.stdout:
+            callback()
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+
+
+# events triggered by hand (for tests and development machines)
+class FakeEventSource:
+    def __init__(self):
+        self.callback = None
+
+    def start(self, callback):
+        self.callback = callback
+
+    def trigger(self):
+        if self.callback is not None:
+            self.callback()
+
+    def stop(self):
+        self.callback = None
+
+
+# get the best event source available on this machine
+def get_event_source(logger):
+    if hasattr(socket, "AF_NETLINK"):
+        try:
+            return NetlinkEventSource()
+        except OSError as e:
+            logger.warning(f"NetworkMonitor: netlink unavailable: {e}")
+    if shutil.which("nmcli"):
+        return NmcliEventSource()
+    return None
+
+
+"""Reachability"""
+
+# default reachability target (a public DNS server answers TCP on port 53)
+PROBE_TARGET = ("8.8.8.8", 53)
+PROBE_TIMEOUT = 1.5
+PROBE_TTL = 30
+
+
+# in-process internet reachability probe (non-blocking TCP connect with a TTL-cached result)
+class ReachabilityProbe:
+    def __init__(self, target=PROBE_TARGET, timeout=PROBE_TIMEOUT, ttl=PROBE_TTL):
+        """
+        :param target: (host, port) to connect to (prefer an IP address; names need a DNS lookup)
+        :param timeout: seconds to wait for the connection
+        :param ttl: seconds a result stays valid
+        """
+        self.target = target
+        self.timeout = timeout
+        self.ttl = ttl
+
+        self.lock = threading.Lock()
+        self.result = None
+        self.checked_at = None
+        self.latency = None
+
+    def check(self, force=False):
+        with self.lock:
+            if not force and self.is_fresh():
+                return self.result
+
+            start = time.monotonic()
+            result = self._probe()
+            self.latency = time.monotonic() - start if result else None
+            self.result = result
+            self.checked_at = time.monotonic()
+            return result
+
+    def get(self):
+        """last known result (never probes)"""
+        return bool(self.result)
+
+    def is_fresh(self):
+        return self.checked_at is not None and time.monotonic() - self.checked_at < self.ttl
+
+    def invalidate(self):
+        self.checked_at = None
+
+    def _probe(self):
+        host, port = self.target
+        try:
+            family, kind, proto, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+        except OSError:
+            return False
+
+        with socket.socket(family, kind, proto) as s:
+            s.setblocking(False)
+            code = s.connect_ex(address)
+            if code not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, getattr(errno, "WSAEWOULDBLOCK", -1)):
+                return False
+            if code != 0:
+                _, writable, errored = select.select([], [s], [s], self.timeout)
+                if not writable or errored:
+                    return False
+            return s.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0
+
+
+# local TCP listener that stands in for the internet in tests
+class LocalProbeTarget:
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(8)
+        self.address = self.sock.getsockname()
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+"""Wi-Fi scanning"""
+
+# nmcli terse output escapes ':' and '\\' inside fields
+_nmcli_separator = re.compile(r"(?<!\\):")
+
+
+def _split_nmcli_line(line):
+    return [field.replace("\\:", ":").replace("\\\\", "\\") for field in _nmcli_separator.split(line)]
+
+
+# parse `nmcli -t -f IN-USE,SSID,SIGNAL dev wifi list`
+def parse_nmcli_wifi(output):
+    networks = {}
+    for line in output.splitlines():
+        fields = _split_nmcli_line(line)
+        if len(fields) != 3 or not fields[1]:
+            continue
+        in_use, ssid, signal = fields
+        try:
+            signal = int(signal)
+        except ValueError:
+            continue
+
+        # the same SSID shows up once per access point; keep the strongest
+        in_use = in_use.strip() == "*"
+        if ssid not in networks or signal > networks[ssid]["signal"] or in_use:
+            networks[ssid] = {"ssid": ssid, "signal": signal, "in_use": in_use or networks.get(ssid, {}).get("in_use", False)}
+
+    return sorted(networks.values(), key=lambda n: n["signal"], reverse=True)
+
+
+# parse /proc/net/wireless (link quality is out of 70)
+def parse_proc_wireless(text):
+    interfaces = {}
+    for line in text.splitlines()[2:]:
+        if ":" not in line:
+            continue
+        name, values = line.split(":", 1)
+        values = values.split()
+        if len(values) < 3:
+            continue
+        try:
+            link = float(values[1].rstrip("."))
+            level = float(values[2].rstrip("."))
+        except ValueError:
+            continue
+        interfaces[name.strip()] = {"signal": min(100, int(link * 100 / 70)), "level": level}
+    return interfaces
+
+
+# background Wi-Fi scanner (the UI only ever reads cached results)
+class WifiScanner:
+    def __init__(self, logger, active_interval=10, idle_interval=60, max_idle_interval=600):
+        """
+        Scans every ``active_interval`` seconds while the network room is open; otherwise
+        the interval starts at ``idle_interval`` and doubles up to ``max_idle_interval``.
+        """
+        self.logger = logger
+
+        self.active_interval = active_interval
+        self.idle_interval = idle_interval
+        self.max_idle_interval = max_idle_interval
+
+        self.active = False
+        self.lock = threading.Lock()
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(name="SHUGRPi Wifi Scanner", target=self._run, daemon=True)
+
+        self.networks = []
+        self.signal = None
+        self.last_scan = None
+
+        self.use_nmcli = shutil.which("nmcli") is not None
+        self.use_proc = os.path.exists("/proc/net/wireless")
+
+    def is_available(self):
+        return self.use_nmcli or self.use_proc
+
+    def start(self):
+        if self.is_available():
+            self.thread.start()
+        else:
+            self.logger.info("WifiScanner: no scan source available")
+
+    def set_active(self, active):
+        if active != self.active:
+            self.active = active
+            if active:
+                self.wake_event.set()
+
+    def _run(self):
+        idle_interval = self.idle_interval
+        while not self.stop_event.is_set():
+            try:
+                self.scan()
+            except Exception as e:
+                self.logger.error(f"WifiScanner: failed to scan: {e}")
+
+            if self.active:
+                interval = self.active_interval
+                idle_interval = self.idle_interval
+            else:
+                interval = idle_interval
+                idle_interval = min(idle_interval * 2, self.max_idle_interval)
+
+            self.wake_event.wait(interval)
+            self.wake_event.clear()
+
+    def scan(self):
+        networks = []
+        signal = None
+
+        if self.use_nmcli:
+            done_proc = subprocess.run(["nmcli", "-t", "-f", "IN-USE,SSID,SIGNAL", "dev", "wifi", "list"],
+                                       capture_output=True, text=True, timeout=15)
+            if done_proc.returncode == 0:
+                networks = parse_nmcli_wifi(done_proc.stdout)
+                connected = [n for n in networks if n["in_use"]]
+                if connected:
+                    signal = connected[0]["signal"]
+
+        if signal is None and self.use_proc:
+            with open("/proc/net/wireless", "r") as f:
+                interfaces = parse_proc_wireless(f.read())
+            if interfaces:
+                signal = max(i["signal"] for i in interfaces.values())
+
+        with self.lock:
+            self.networks = networks
+            self.signal = signal
+            self.last_scan = time.monotonic()
+
+    def get_networks(self):
+        with self.lock:
+            return list(self.networks)
+
+    def get_signal(self):
+        return self.signal
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake_event.set()
+
+
+"""Monitor"""
+
+# event-driven network monitor
+class NetworkMonitor:
+    def __init__(self, check, logger, event_source=None, min_backoff=1, max_backoff=60, idle_interval=300, debounce=0.25):
+        """
+        Runs ``check`` whenever the event source reports a change. ``check`` returns True
+        while the network is in a state worth re-checking (e.g. connected without internet),
+        in which case it is re-run with exponential backoff until it returns False.
+
+        :param check: function that refreshes the network status
+        :param event_source: source of change events (None falls back to ``idle_interval`` polling)
+        :param idle_interval: seconds between re-checks while nothing happens
+        :param debounce: seconds to wait so a burst of events results in a single check
+        """
+        self.check = check
+        self.logger = logger
+        self.event_source = event_source
+
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.idle_interval = idle_interval if event_source is not None else min(idle_interval, 30)
+        self.debounce = debounce
+
+        self.changed = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(name="SHUGRPi Network Monitor", target=self._run, daemon=True)
+
+        self.num_checks = 0
+
+    def start(self):
+        if self.event_source is not None:
+            try:
+                self.event_source.start(self.notify)
+            except OSError as e:
+                self.logger.warning(f"NetworkMonitor: failed to start event source: {e}")
+                self.event_source = None
+                self.idle_interval = min(self.idle_interval, 30)
+        self.thread.start()
+
+    def notify(self):
+        self.changed.set()
+
+    def _run(self):
+        backoff = None
+
+        # initial check
+        self.changed.set()
+
+        while not self.stop_event.is_set():
+            timeout = backoff if backoff is not None else self.idle_interval
+            event = self.changed.wait(timeout)
+            if self.stop_event.is_set():
+                break
+
+            if event:
+                # let a burst of events settle
+                self.stop_event.wait(self.debounce)
+                self.changed.clear()
+                backoff = None
+
+            self.num_checks += 1
+            if self.check():
+                backoff = self.min_backoff if backoff is None else min(backoff * 2, self.max_backoff)
+            else:
+                backoff = None
+
+    def stop(self):
+        self.stop_event.set()
+        self.changed.set()
+        if self.event_source is not None:
+            self.event_source.stop()
+
+
+__all__ = ["NetworkMonitor", "ReachabilityProbe", "LocalProbeTarget", "NetlinkEventSource", "NmcliEventSource", "FakeEventSource", "get_event_source",
+           "WifiScanner", "parse_nmcli_wifi", "parse_proc_wireless"]
@@ -0,0 +1,200 @@
+"""Update API for the SHUGRPi OS"""
+
+import threading
+import os
+
+
+# downloaded update waiting for the next boot (kept inside .git so the work tree stays clean)
+PENDING_FILE = "shugrpi_pending_update"
+
+# commit the OS was on while an update is being applied (left behind if the update was interrupted)
+APPLYING_FILE = "shugrpi_applying_update"
+
+
+# background update checker (fetches ahead of time, applies at boot)
+class UpdateService:
+    def __init__(self, runner, logger, repo_path, remote="origin", branch="main", interval=6 * 3600, min_backoff=60, max_backoff=3600):
+        """
+        Fetches ``remote``/``branch`` every ``interval`` seconds (or with exponential backoff
+        between ``min_backoff`` and ``max_backoff`` while the remote cannot be reached).
+        A newer commit is downloaded right away but only checked out by ``apply_pending``.
+
+        :param runner: ``CommandRunner`` used to run git
+        :param repo_path: path to the OS repository
+        """
+        self.runner = runner
+        self.logger = logger
+        self.repo_path = repo_path
+        self.remote = remote
+        self.branch = branch
+
+        self.interval = interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self.on_available = None
+
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event()
+        self.thread = threading.Thread(name="SHUGRPi Update Service", target=self._run, daemon=True)
+
+        self.num_checks = 0
+        self.pending_path = os.path.join(repo_path, ".git", PENDING_FILE)
+        self.applying_path = os.path.join(repo_path, ".git", APPLYING_FILE)
+
+    def start(self, on_available=None):
+        """``on_available(commit)`` is called (on the main loop) once an update is downloaded"""
+        self.on_available = on_available
+        self.thread.start()
+
+    def check_now(self):
+        self.wake_event.set()
+
+    def _run(self):
+        backoff = None
+        while not self.stop_event.is_set():
+            try:
+                reached = self.check()
+            except Exception as e:
+                self.logger.error(f"UpdateService: failed to check for updates: {e}")
+                reached = False
+
+            if reached:
+                backoff = None
+                interval = self.interval
+            else:
+                backoff = self.min_backoff if backoff is None else min(backoff * 2, self.max_backoff)
+                interval = backoff
+
+            self.wake_event.wait(interval)
+            self.wake_event.clear()
+
+    def check(self):
+        """fetch and compare refs (returns False if the remote could not be reached)"""
+        self.num_checks += 1
+
+        result = self._git("fetch", "--quiet", self.remote, self.branch, timeout=300)
+        if result.code != 0:
+            self.logger.warning(f"UpdateService: failed to fetch `{self.remote}/{self.branch}`: {result.stderr.strip()}")
+            return False
+
+        local = self._rev_parse("HEAD")
+        remote = self._rev_parse(f"{self.remote}/{self.branch}")
+        if local is None or remote is None:
+            return False
+
+        if local == remote:
+            self.clear_pending()
+            return True
+
+        # only fast-forwards are applied
+        if self._git("merge-base", "--is-ancestor", "HEAD", remote).code != 0:
+            self.logger.warning(f"UpdateService: local branch has diverged from `{self.remote}/{self.branch}`")
+            return True
+
+        if remote != self.get_pending():
+            self._set_pending(remote)
+            count = self._git("rev-list", "--count", f"HEAD..{remote}").stdout.strip()
+            self.logger.info(f"UpdateService: downloaded update {remote[:7]} ({count} new commits)")
+            if self.on_available is not None:
+                self.runner.post(self.on_available, remote)
+        return True
+
+    def apply_pending(self):
+        """check out a downloaded update (call at boot, before the OS starts)"""
+        if not self._recover():
+            return False
+
+        pending = self.get_pending()
+        if pending is None:
+            return False
+
+        if self._rev_parse("HEAD") == pending:
+            self.clear_pending()
+            return False
+
+        if self._git("cat-file", "-e", f"{pending}^{{commit}}").code != 0:
+            self.logger.warning(f"UpdateService: update {pending[:7]} is missing; discarding it")
+            self.clear_pending()
+            return False
+
+        # git refuses before touching the work tree if the update conflicts with it, but a power cut while
+        # files are being written leaves it half-updated (``_recover`` rolls that back at the next boot)
+        original = self._rev_parse("HEAD")
+        if original is None:
+            return False
+        self._write(self.applying_path, original)
+        result = self._git("merge", "--ff-only", "--quiet", pending, timeout=120)
+        self.clear_pending()
+        os.remove(self.applying_path)
+        if result.code != 0:
+            self.logger.error(f"UpdateService: failed to apply update {pending[:7]}: {result.stderr.strip()}")
+            return False
+
+        self.logger.info(f"UpdateService: updated to {pending[:7]}")
+        return True
+
+    def _recover(self):
+        """roll back an update that was interrupted while being applied (returns False if that failed)"""
+        try:
+            with open(self.applying_path, "r") as f:
+                original = f.read().strip()
+        except OSError:
+            return True
+
+        # a lock left behind by the interrupted git would block the recovery (nothing else runs git this early)
+        lock_path = os.path.join(self.repo_path, ".git", "index.lock")
+        if os.path.exists(lock_path):
+            os.remove(lock_path)
+
+        # a work tree that matches HEAD was either fully updated or never touched
+        status = self._git("status", "--porcelain", "--untracked-files=no")
+        if status.code == 0 and not status.stdout.strip():
+            self.logger.info("UpdateService: previous update was interrupted, but the work tree is intact")
+        else:
+            self.logger.warning(f"UpdateService: previous update was interrupted; rolling back to {original[:7]}")
+            result = self._git("reset", "--hard", "--quiet", original, timeout=120)
+            if result.code != 0:
+                self.logger.error(f"UpdateService: failed to roll back to {original[:7]}: {result.stderr.strip()}")
+                return False
+        os.remove(self.applying_path)
+        return True
+
+    def get_pending(self):
+        try:
+            with open(self.pending_path, "r") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def _set_pending(self, commit):
+        self._write(self.pending_path, commit)
+
+    def _write(self, path, text):
+        # write-then-rename so a power cut never leaves a half-written file
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def clear_pending(self):
+        if os.path.exists(self.pending_path):
+            os.remove(self.pending_path)
+
+    def _rev_parse(self, ref):
+        result = self._git("rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}")
+        if result.code != 0:
+            return None
+        return result.stdout.strip()
+
+    def _git(self, *args, timeout=30):
+        return self.runner.execute(["git", *args], timeout=timeout, cwd=self.repo_path)
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake_event.set()
+
+
+__all__ = ["UpdateService"]
@@ -9,23 +9,31 @@ import time
 import threading
 import shutil
 import json
-from socket import gethostbyname, gethostname
+import zlib
+from collections import OrderedDict, deque
 from constants import *
+from lazy_import import LazyModule
+
+# only needed once the menu is up
+socket = LazyModule("socket")
+network_api = LazyModule("network_api")
 
 # misc values
 base_path = os.path.dirname(os.path.abspath(__file__))
 default_font = os.path.join(base_path, "fonts", "Kenney_Bold.ttf")
 retro_font = os.path.join(base_path, "fonts", "PressStart2P.ttf")
 font_cache = {}
+glyph_cache = {}
 
-temp_dir = os.path.join(base_path, "logs")
+# logs go next to the OS unless SHUGRPI_LOG_DIR points somewhere else (e.g. for benchmark runs)
+temp_dir = os.environ.get("SHUGRPI_LOG_DIR") or os.path.join(base_path, "logs")
 
 
 """ Logging Helpers"""
 
 def init_logger():
     if not os.path.exists(temp_dir):
-        os.mkdir(temp_dir)
+        os.makedirs(temp_dir)
 
     # set up logger
     logging.basicConfig(
@@ -43,6 +51,51 @@ def quit_logger():
     logging.shutdown()
 
 
+# boot stage timings (time-to-first-frame is appended to logs/boot_times.jsonl on every boot)
+class BootTimeline:
+    def __init__(self, logger, start=None):
+        self.logger = logger
+        self.start = start if start is not None else time.perf_counter()
+        self.last_lap = self.start
+
+        self.stages = []
+        self.marks = {}
+
+    def lap(self, name):
+        """record a stage that ran since the previous lap"""
+        now = time.perf_counter()
+        self.stages.append([name, now - self.last_lap])
+        self.last_lap = now
+
+    def run(self, name, func, *args):
+        """record how long ``func`` takes"""
+        start = time.perf_counter()
+        result = func(*args)
+        self.stages.append([name, time.perf_counter() - start])
+        self.last_lap = time.perf_counter()
+        return result
+
+    def mark(self, name):
+        """record a point in time (only the first mark of a name counts)"""
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.start
+
+    def report(self):
+        self.logger.info("Boot timeline:")
+        for name, duration in self.stages:
+            self.logger.info(f"    {name:<24}{duration * 1000:>8.1f}ms")
+        for name, offset in self.marks.items():
+            self.logger.info(f"    {'[' + name + ']':<24}{offset * 1000:>8.1f}ms")
+
+        try:
+            with open(os.path.join(temp_dir, "boot_times.jsonl"), "a") as f:
+                f.write(json.dumps({"timestamp":time.time(),
+                                    "marks":{k:round(v, 4) for k, v in self.marks.items()},
+                                    "stages":{k:round(v, 4) for k, v in self.stages}}) + "\n")
+        except OSError as e:
+            self.logger.warning(f"BootTimeline: failed to save: {e}")
+
+
 """ Device Managers """
 
 # compatibility management
@@ -78,19 +131,235 @@ class CompatibilityManager:
         return self.is_shugrpi, self.base_path, os.environ.copy()
 
 
+# audio drivers to probe, in order
+AUDIO_DRIVERS = ["wasapi", "alsa", "dummy"]
+
+
+# identifies this machine and its audio hardware
+def get_audio_fingerprint():
+    parts = [platform.node(), platform.machine(), os.environ.get("AUDIODEV", "")]
+    if os.path.exists("/proc/asound/cards"):
+        with open("/proc/asound/cards", "r") as f:
+            parts.append(f.read())
+    data = "\n".join(parts).encode()
+    return f"{zlib.crc32(data):08x}"
+
+
+# known-good audio driver and mixer parameters per device
+class AudioDriverCache:
+    def __init__(self, logger, path=os.path.join("data", "audio_cache.json")):
+        self.logger = logger
+        self.path = path
+        self.data = self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, fingerprint):
+        return self.data.get(fingerprint)
+
+    def set(self, fingerprint, driver, params):
+        self.data[fingerprint] = {"driver":driver, "params":params}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(json.dumps(self.data, indent=4))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.warning(f"AudioDriverCache: failed to save: {e}")
+
+
+# os.environ may be a plain copy (see CompatibilityManager.init), so SDL is told directly as well
+def set_audio_driver(driver):
+    os.environ["SDL_AUDIODRIVER"] = driver
+    os.putenv("SDL_AUDIODRIVER", driver)
+
+
+def _try_audio_driver(driver, params):
+    set_audio_driver(driver)
+    pygame.mixer.quit()
+    try:
+        pygame.mixer.init(*params)
+        return True
+    except pygame.error:
+        return False
+
+
+# initialize the mixer with the cached driver (only probing the others if it fails)
+def init_mixer(logger, profile, drivers=AUDIO_DRIVERS):
+    params = [profile["frequency"], profile["size"], profile["channels"], profile["buffer"]]
+    fingerprint = get_audio_fingerprint()
+    cache = AudioDriverCache(logger)
+
+    # "dummy" is only a fallback, so the real drivers are always tried again before it
+    entry = cache.get(fingerprint)
+    cached = entry["driver"] if entry and entry["params"] == params and entry["driver"] != "dummy" else None
+    if cached is not None:
+        if _try_audio_driver(cached, params):
+            return cached
+        logger.warning(f"Cached audio driver failed: {cached}")
+
+    start = time.perf_counter()
+    for driver in drivers:
+        if driver == cached:
+            continue
+        if _try_audio_driver(driver, params):
+            logger.info(f"Probed audio driver: {driver} ({(time.perf_counter() - start) * 1000:.0f}ms)")
+            if driver != "dummy":
+                cache.set(fingerprint, driver, params)
+            return driver
+        logger.error(f"Driver not available: {driver}")
+
+    return None
+
+
+# decoded sounds kept in memory (decoded lazily on a background thread, evicted past a byte budget)
+class AudioBank:
+    def __init__(self, logger, budget=16 * 1024 * 1024):
+        self.logger = logger
+        self.budget = budget
+
+        self.paths = {}
+        self.sounds = OrderedDict()
+        self.size = 0
+
+        self.lock = threading.Lock()
+        self.queue = deque()
+        self.wake_event = threading.Event()
+        self.thread = threading.Thread(name="SHUGRPi Audio Bank", target=self._run, daemon=True)
+        self.thread.start()
+
+    def register(self, name, path):
+        self.paths[name] = path
+
+    def preload(self, *names):
+        """decode sounds ahead of time on the background thread"""
+        self.queue.extend(names or self.paths)
+        self.wake_event.set()
+
+    def _run(self):
+        while True:
+            self.wake_event.wait()
+            self.wake_event.clear()
+            while self.queue:
+                try:
+                    self._load(self.queue.popleft())
+                except Exception as e:
+                    self.logger.error(f"AudioBank: failed to decode sound: {e}")
+
+    def get(self, name):
+        """decoded sound (decoded right away if the background thread hasn't reached it yet)"""
+        with self.lock:
+            sound = self.sounds.get(name)
+            if sound is not None:
+                self.sounds.move_to_end(name)
+                return sound
+        return self._load(name)
+
+    def _load(self, name):
+        with self.lock:
+            if name in self.sounds:
+                return self.sounds[name]
+
+            sound = pygame.mixer.Sound(self.paths[name])
+            self.sounds[name] = sound
+            self.size += self._get_size(sound)
+            self._evict(keep=name)
+            return sound
+
+    def _get_size(self, sound):
+        frequency, size, channels = pygame.mixer.get_init()
+        return int(sound.get_length() * frequency * channels * abs(size) // 8)
+
+    def _evict(self, keep=None):
+        # drop the least recently used sounds that aren't playing
+        for name in list(self.sounds):
+            if self.size <= self.budget:
+                break
+            sound = self.sounds[name]
+            if name == keep or sound.get_num_channels():
+                continue
+            del self.sounds[name]
+            self.size -= self._get_size(sound)
+
+
+# input-to-sound latency estimate (the time spent in the OS plus one mixer buffer;
+# the latency of the audio device and driver behind the mixer is not included)
+class LatencyEstimator:
+    def __init__(self, logger, buffer_latency, report_every=20):
+        self.logger = logger
+        self.buffer_latency = buffer_latency
+        self.report_every = report_every
+
+        self.input_time = None
+        self.samples = deque(maxlen=100)
+        self.num_samples = 0
+
+    def mark_input(self):
+        self.input_time = time.perf_counter()
+
+    def mark_sound(self):
+        # ignore sounds that weren't caused by a recent key press
+        if self.input_time is None or time.perf_counter() - self.input_time > 1:
+            self.input_time = None
+            return
+
+        # time spent in the OS, plus at most one mixer buffer before the device gets the sound
+        self.samples.append(time.perf_counter() - self.input_time + self.buffer_latency)
+        self.input_time = None
+        self.num_samples += 1
+
+        if self.num_samples % self.report_every == 0:
+            self.report()
+
+    def report(self):
+        if not self.samples:
+            return
+        samples = sorted(self.samples)
+        average = sum(samples) / len(samples)
+        p95 = samples[min(len(samples) - 1, int(len(samples) * .95))]
+        self.logger.info(f"AudioManager: estimated input-to-sound latency avg {average * 1000:.1f}ms, p95 {p95 * 1000:.1f}ms, "
+                         f"max {samples[-1] * 1000:.1f}ms ({self.buffer_latency * 1000:.1f}ms of mixer buffer, device latency not included, "
+                         f"{len(samples)} samples)")
+
+
 # audio management
 class AudioManager:
-    def __init__(self, logger, is_shugrpi):
+    def __init__(self, logger, is_shugrpi, profile=DEFAULT_MIXER):
+        self.logger = logger
+
         # master library for sounds and music tracks
         self.master_sounds = {}
         self.master_music_tracks = {}
-        self.working = True
+        self.working = pygame.mixer.get_init() is not None
 
-        try:
+        # currently loaded music (kept open between plays)
+        self.current_music = None
+        self.music_fading = False
+
+        # UI sounds get channels of their own so they are never dropped
+        self.ui_channels = []
+        self.ui_channel_starts = []
+        self.latency_meter = None
+
+        if self.working:
+            pygame.mixer.set_num_channels(max(profile["num_channels"], UI_CHANNELS + 1))
+            pygame.mixer.set_reserved(UI_CHANNELS)
+            self.ui_channels = [pygame.mixer.Channel(i) for i in range(UI_CHANNELS)]
+            self.ui_channel_starts = [0.0] * UI_CHANNELS
+
+            if profile["estimate_latency"]:
+                self.latency_meter = LatencyEstimator(logger, profile["buffer"] / pygame.mixer.get_init()[0])
+
+            self.bank = AudioBank(logger)
             self._load_sounds()
             self._load_musics()
-        except:
-            self.working = False
+            self.bank.preload()
 
     def _get_sound_path(self, path):
         return os.path.join(base_path, "audio", path + ".wav")
@@ -98,42 +367,83 @@ class AudioManager:
     def _get_music_path(self, path):
         return os.path.join(base_path, "audio", path + ".mp3")
 
+    def _add_sound(self, name, path, volume, ui=False):
+        self.bank.register(name, self._get_sound_path(path))
+        self.master_sounds[name] = [volume, False, ui]
+
     def _load_sounds(self):
-        self.master_sounds["logo"] = [pygame.mixer.Sound(self._get_sound_path("shugrpi_alt")), .75, False]
-        self.master_sounds["menu_swish"] = [pygame.mixer.Sound(self._get_sound_path("menu_swish")), .2, False]
-        self.master_sounds["menu_up"] = [pygame.mixer.Sound(self._get_sound_path("menu_up")), .2, False]
-        self.master_sounds["menu_down"] = [pygame.mixer.Sound(self._get_sound_path("menu_down")), .2, False]
+        self._add_sound("logo", "shugrpi_alt", .75)
+        self._add_sound("menu_swish", "menu_swish", .2, ui=True)
+        self._add_sound("menu_up", "menu_up", .2, ui=True)
+        self._add_sound("menu_down", "menu_down", .2, ui=True)
 
     def _load_musics(self):
         self.master_music_tracks["shugrpi_bg"] = [self._get_music_path("shugrpi_bg"), .2]
 
     def play_music(self, music):
-        if self.working:
-            pygame.mixer.music.fadeout(1000)
+        if not self.working:
+            return
+
+        path, volume = self.master_music_tracks[music]
+        try:
+            if self.current_music == music:
+                # already playing; otherwise the stream is still open and only needs restarting
+                if pygame.mixer.music.get_busy() and not self.music_fading:
+                    return
+            else:
+                pygame.mixer.music.load(path)
+                self.current_music = music
 
-            pygame.mixer.music.load(self.master_music_tracks[music][0])
-            pygame.mixer.music.set_volume(self.master_music_tracks[music][1])
+            pygame.mixer.music.set_volume(volume)
             pygame.mixer.music.play(-1, fade_ms=500)
+            self.music_fading = False
+        except pygame.error as e:
+            self.logger.error(f"AudioManager: failed to play `{music}`: {e}")
 
     def stop_music(self):
         if self.working:
             pygame.mixer.music.fadeout(500)
+            self.music_fading = True
 
     def play_sound(self, sound, in_loop=False):
         if self.working:
-            if not self.master_sounds[sound][2]:
-                self.master_sounds[sound][0].set_volume(self.master_sounds[sound][1])
-                self.master_sounds[sound][0].play(0)
-                self.master_sounds[sound][2] = in_loop
+            if not self.master_sounds[sound][1]:
+                try:
+                    sound_obj = self.bank.get(sound)
+                except pygame.error as e:
+                    self.logger.error(f"AudioManager: failed to load `{sound}`: {e}")
+                    return
+                sound_obj.set_volume(self.master_sounds[sound][0])
+                if self.master_sounds[sound][2]:
+                    self._get_ui_channel().play(sound_obj)
+                    if self.latency_meter is not None:
+                        self.latency_meter.mark_sound()
+                else:
+                    sound_obj.play(0)
+                self.master_sounds[sound][1] = in_loop
+
+    def _get_ui_channel(self):
+        # a free reserved channel, otherwise the one that was started longest ago
+        index = next((i for i, channel in enumerate(self.ui_channels) if not channel.get_busy()), None)
+        if index is None:
+            index = min(range(len(self.ui_channels)), key=self.ui_channel_starts.__getitem__)
+        self.ui_channel_starts[index] = time.perf_counter()
+        return self.ui_channels[index]
+
+    def mark_input(self):
+        if self.latency_meter is not None:
+            self.latency_meter.mark_input()
 
     def stop_sound(self, sound):
         if self.working:
-            self.master_sounds[sound][0].stop()
-            self.master_sounds[sound][2] = False
+            sound_obj = self.bank.sounds.get(sound)
+            if sound_obj is not None:
+                sound_obj.stop()
+            self.master_sounds[sound][1] = False
 
     def reset_sounds(self):
         for sound in self.master_sounds:
-            self.master_sounds[sound][2] = False
+            self.master_sounds[sound][1] = False
 
     def stop_all(self):
         if self.working:
@@ -142,7 +452,7 @@ class AudioManager:
 
 # network management
 class NetworkManager:
-    def __init__(self, linux, dm, logger):
+    def __init__(self, linux, dm, logger, event_source=None, probe_target=None):
         self.linux = linux
         self.dm = dm
         self.logger = logger
@@ -152,58 +462,83 @@ class NetworkManager:
 
         self.linux.reload_wifi(self.ssid, self.psk_key)
 
-        self.ip = self._get_ip()
+        self.ip = "127.0.0.1"
 
         self.statuses = ["Poor", "Moderate", "Good", "Excellent"]
-        self.signal_strength = 0
+        self.signal_strength = None
         self.status = "inactive"
 
         self.logged = False
 
-        self.wifi_connected = self._check_wifi_connection()
-        self.internet_access = self._check_internet_access()
+        # status is filled in by the monitor thread as soon as it starts
+        self.wifi_connected = False
+        self.internet_access = False
+        self.probe = network_api.ReachabilityProbe(probe_target) if probe_target else network_api.ReachabilityProbe()
 
-        self.stop_event = threading.Event()
         self.wifi_lock = threading.Lock()
-        self.wifi_thread = threading.Thread(name="SHUGRPi Network Manager", target=self._update_status, daemon=True)
-        self.wifi_thread.start()
-
+        if event_source is None:
+            event_source = network_api.get_event_source(self.logger)
+        self.monitor = network_api.NetworkMonitor(self._update_status, self.logger, event_source)
+        self.monitor.start()
+
+        self.scanner = network_api.WifiScanner(self.logger)
+        self.scanner.start()
+
+        # SSIDs offered as completions: networks connected to before are kept and rank above the
+        # networks in range, which are replaced on every scan
+        self.ssid_completions = PrefixTrie()
+        self.known_ssids = [ssid for ssid in self.dm.data["known_ssids"] + [self.ssid] if ssid]
+        self.last_scan = None
         self.text_fields = {}
+        self.texts = []
+        self._update_completions([])
 
         self.ui_group = pygame.sprite.Group()
 
     def _get_ip(self):
-        return gethostbyname(gethostname())
+        # a UDP "connection" only picks a route and local address; no packets are sent
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+                s.connect(("8.8.8.8", 53))
+                return s.getsockname()[0]
+        except OSError:
+            return "127.0.0.1"
 
     def _check_wifi_connection(self):
         new_ip = self._get_ip()
-        if new_ip not in ["127.0.0.1", "localhost"]:
+        if new_ip not in ["127.0.0.1", "localhost", "0.0.0.0"]:
             self.ip = new_ip
             return True
         return False
 
     def _update_status(self):
+        """refresh status (returns True if it is worth re-checking soon)"""
         try:
-            while not self.stop_event.wait(3):
-                self.wifi_connected = self._check_wifi_connection()
-                if self.wifi_connected:
-                    with self.wifi_lock:
-                        self.internet_access = self._check_internet_access()
-                        if self.internet_access:
-                            self.status = "connected"
-                        else:
-                            self.status = "no internet"
-                else:
-                    with self.wifi_lock:
-                        self.status = "not connected"
+            wifi_connected = self._check_wifi_connection()
+            internet_access = self._check_internet_access() if wifi_connected else False
         except Exception as e:
             self.logger.error(f"NetworkManager: failed to update internet status: {e}")
             with self.wifi_lock:
                 self.status = "error"
+            return True
+
+        with self.wifi_lock:
+            self.wifi_connected = wifi_connected
+            self.internet_access = internet_access
+            if not wifi_connected:
+                self.status = "not connected"
+            elif internet_access:
+                self.status = "connected"
+            else:
+                self.status = "no internet"
+
+        return wifi_connected and not internet_access
 
     def _check_internet_access(self):
-        if self.linux.ping() == 0:
+        # something changed, so a cached result cannot be trusted
+        if self.probe.check(force=True):
             self.logger.info("SHUGRPi has access to the internet")
+            self.logged = False
             return True
         else:
             if not self.logged:
@@ -211,6 +546,25 @@ class NetworkManager:
                 self.logged = True
             return False
 
+    def _get_signal_strength(self):
+        signal = self.scanner.get_signal()
+        if signal is None:
+            return None
+        return min(signal * len(self.statuses) // 100, len(self.statuses) - 1)
+
+    def set_room_open(self, room_open):
+        # scan often only while someone is looking at the results
+        self.scanner.set_active(room_open)
+
+    def get_networks(self):
+        return self.scanner.get_networks()
+
+    def has_internet(self):
+        """cached reachability (re-probes only once the cached result has expired)"""
+        if not self.wifi_connected:
+            return False
+        return self.probe.check()
+
     def setup_ui(self, virtual_keyboard):
         first_col_x = 75
         first_col_y = 244
@@ -223,46 +577,77 @@ class NetworkManager:
         self.wifi_header_text = Text("Network Status", 190, first_col_y - 50, WHITE, 15, default_font, True)
         self.wifi_name_text = Text(f"Wifi Connection: {self.ssid}", first_col_x, first_col_y, WHITE, 11, retro_font, False)
         self.status_text = Text(f"Status: {self.status}", first_col_x, first_col_y + 50, WHITE, 11, retro_font, False)
-        self.signal_text = Text(f"Signal Strength: {self.statuses[self.signal_strength]}", first_col_x, first_col_y + 100, WHITE, 11, retro_font, False)
+        self.signal_text = Text("Signal Strength: None", first_col_x, first_col_y + 100, WHITE, 11, retro_font, False)
 
         self.connect_header_text = Text("Wifi Setup", second_col_x + 50, first_col_y - 50, WHITE, 15, default_font, True)
 
         self.ssid_text = Text("SSID", second_col_x - 50, second_col_y + 2, WHITE, 12, default_font, True)
-        self.text_fields["ssid"] = TextField(second_col_x + 100, second_col_y, 0, 0, 200, 30, "Enter your SSID here", group=self.ui_group, keyboard=virtual_keyboard)
+        self.text_fields["ssid"] = TextField(second_col_x + 100, second_col_y, 0, 0, 200, 30, "Enter your SSID here", group=self.ui_group, keyboard=virtual_keyboard, completions=self.ssid_completions)
         self.password_text = Text("Password", second_col_x - 70, second_col_y + 52, WHITE, 12, default_font, True)
         self.text_fields["psk_key"] = TextField(second_col_x + 100, second_col_y + 50, 1, 0, 200, 30, "Enter your password here", group=self.ui_group, keyboard=virtual_keyboard, needs_hash=True)
 
         self.connect_ui = UiElement("Connect", second_col_x + 35, second_col_y + 100, 2, 0, size=10, font=default_font, group=self.ui_group, func=lambda: self.connect_wifi(self.text_fields["ssid"], self.text_fields["psk_key"]))
 
+        self.texts = [self.main_header_text,
+                      self.wifi_header_text, self.wifi_name_text, self.status_text, self.signal_text,
+                      self.connect_header_text, self.ssid_text, self.password_text]
+
     def connect_wifi(self, ssid, psk_key):
-        if self.linux.connect_wifi(ssid.value, psk_key.value) == 0:
-            self.dm.update("network", {"ssid":ssid.value, "psk-key":psk_key.value})
+        ssid, psk_key = ssid.value, psk_key.value
+
+        def on_done(result):
+            if result.code == 0:
+                self.dm.update("network", {"ssid":ssid, "psk-key":psk_key})
+                self.dm.update("known_ssids", ([s for s in self.dm.data["known_ssids"] if s != ssid] + [ssid])[-MAX_KNOWN_SSIDS:])
+                if ssid not in self.known_ssids:
+                    self.known_ssids.append(ssid)
+                    self.ssid_completions.insert(ssid, 2)
+            self.monitor.notify()
+
+        self.linux.connect_wifi(ssid, psk_key, callback=on_done)
+
+    def _update_completions(self, networks):
+        # networks in range rank by signal strength
+        self.ssid_completions.clear()
+        for ssid in self.known_ssids:
+            self.ssid_completions.insert(ssid, 2)
+        for network in networks:
+            self.ssid_completions.insert(network["ssid"], network["signal"] / 100)
+
+        if "ssid" in self.text_fields:
+            self.text_fields["ssid"].refresh()
 
     def disconnect_wifi(self):
         self.wifi_connected = False
         self.internet_access = False
-        self.linux.disconnect_wifi()
+        self.linux.disconnect_wifi(callback=lambda result: self.monitor.notify())
         self.logger.info(f"NetworkManager: disconnected wifi")
+        self.monitor.notify()
 
     def update(self):
+        if self.scanner.last_scan != self.last_scan:
+            self.last_scan = self.scanner.last_scan
+            self._update_completions(self.get_networks())
+
+        self.signal_strength = self._get_signal_strength()
+        if not self.wifi_connected:
+            signal_label = "None"
+        elif self.signal_strength is None:
+            signal_label = "Unknown"
+        else:
+            signal_label = self.statuses[self.signal_strength]
+
         self.wifi_name_text.set_text(f"Wifi Connection: " + str(self.ssid))
         self.status_text.set_text(f"Status: {self.status}")
-        self.signal_text.set_text(f"Signal Strength: {self.statuses[self.signal_strength] if self.wifi_connected else "None"}")
+        self.signal_text.set_text(f"Signal Strength: {signal_label}")
 
     def draw(self, display):
-        self.main_header_text.draw(display)
-
-        self.wifi_header_text.draw(display)
-        self.wifi_name_text.draw(display)
-        self.status_text.draw(display)
-        self.signal_text.draw(display)
-
-        self.connect_header_text.draw(display)
-        self.ssid_text.draw(display)
-        self.password_text.draw(display)
+        for text in self.texts:
+            text.draw(display)
 
     def quit(self):
-        self.stop_event.set()
+        self.monitor.stop()
+        self.scanner.stop()
         self.logger.info(f"NetworkManager: quit")
 
 
@@ -287,6 +672,11 @@ class DataManager:
         else:
             with open(self.save_file, "r") as f:
                 data = json.load(f)
+
+            # fill in values added since the save file was written
+            for k, v in DEFAULT_SAVE.items():
+                if k not in data:
+                    data[k] = json.loads(json.dumps(v))
             self.logger.info(f"DataManager: load {[f"{k}: {v}" if k != "loaded_games" else f"{k}: {str(v)[:21] + '...' + str(v)[-2:]}" for k, v in data.items()]}")
             return data
 
@@ -350,6 +740,15 @@ def get_font(font, size):
     return font_cache[actual_font]
 
 
+# single rendered characters (for text that is built up one character at a time)
+def get_glyph(font, size, char, color):
+    key = (str(font), size, char, tuple(color))
+    if key not in glyph_cache:
+        glyph_cache[key] = get_font(font, size).render(char, False, color)
+
+    return glyph_cache[key]
+
+
 # text renderer (simpler)
 def draw_text(display, text, x, y, color, size, font=default_font, centered=False):
     font = get_font(font, size)
@@ -381,6 +780,9 @@ class Text(pygame.sprite.Sprite):
         else:
             self.rect.topleft = (self.x, self.y)
 
+        # called with ``static=True`` when the text changes (see ``Room.add_static``)
+        self.on_change = None
+
     def set_text(self, new_text):
         if self.text != str(new_text):
             self.text = str(new_text)
@@ -391,6 +793,9 @@ class Text(pygame.sprite.Sprite):
             else:
                 self.rect.topleft = (self.x, self.y)
 
+            if self.on_change is not None:
+                self.on_change(True)
+
     def _get_font(self, font, size):
         return get_font(font, size)
 
@@ -398,6 +803,137 @@ class Text(pygame.sprite.Sprite):
         display.blit(self.image, self.rect)
 
 
+# rendered text layouts, by (message, width, style)
+text_layout_cache = OrderedDict()
+MAX_TEXT_LAYOUTS = 32
+
+
+# split a message into lines of (text, is_small) runs ("^" toggles small text)
+def _parse_text(msg):
+    lines = []
+    small = False
+    for paragraph in str(msg).split("\n"):
+        runs = []
+        for i, part in enumerate(paragraph.split("^")):
+            if i:
+                small = not small
+            if part:
+                runs.append((part, small))
+        lines.append(runs)
+    return lines
+
+
+# word-wrap one line of runs so that every line is at most `width` pixels wide
+def _wrap_runs(runs, width, fonts):
+    lines = [[]]
+    line_width = 0
+    for text, small in runs:
+        font = fonts[small]
+        for i, word in enumerate(text.split(" ")):
+            # keep the spaces between words (and runs) in front of the next word
+            if i:
+                word = " " + word
+            word_width = font.size(word)[0]
+
+            if line_width + word_width > width and line_width:
+                lines.append([])
+                line_width = 0
+                word = word.lstrip(" ")
+                word_width = font.size(word)[0]
+
+            # break words that do not fit on a line of their own
+            while word_width > width and len(word) > 1:
+                cut = len(word) - 1
+                while cut > 1 and font.size(word[:cut])[0] > width:
+                    cut -= 1
+                lines[-1].append((word[:cut], small))
+                lines.append([])
+                word = word[cut:]
+                word_width = font.size(word)[0]
+
+            if word:
+                if lines[-1] and lines[-1][-1][1] == small:
+                    lines[-1][-1] = (lines[-1][-1][0] + word, small)
+                else:
+                    lines[-1].append((word, small))
+                line_width += word_width
+    return lines
+
+
+# text layout engine (memoized, so showing the same message again costs nothing)
+def layout_text(msg, width, size, font=default_font, color=WHITE, small_size=None, line_height=None, align="center"):
+    """
+    Word-wraps ``msg`` to ``width`` pixels (by rendered width) and renders it.
+    ``\\n`` starts a new line and text between two ``^`` is drawn at ``small_size``.
+
+    The result is shared through a cache, so the returned surface must not be drawn on.
+
+    :param line_height: distance between lines (defaults to the font's line size)
+    :param align: "left", "center" or "right"
+    :return: (surface, number of lines)
+    """
+    key = (str(msg), width, size, font, tuple(color), small_size, line_height, align)
+    if key in text_layout_cache:
+        text_layout_cache.move_to_end(key)
+        return text_layout_cache[key]
+
+    fonts = {False: get_font(font, size), True: get_font(font, small_size or size)}
+    if line_height is None:
+        line_height = fonts[False].get_linesize()
+    ascent = max(f.get_ascent() for f in fonts.values())
+
+    lines = []
+    for runs in _parse_text(msg):
+        lines.extend(_wrap_runs(runs, width, fonts))
+
+    rendered_lines = []
+    for line in lines:
+        if line:
+            line[0] = (line[0][0].lstrip(" "), line[0][1])
+            line[-1] = (line[-1][0].rstrip(" "), line[-1][1])
+        rendered = [(fonts[small].render(text, False, color), fonts[small]) for text, small in line if text]
+        rendered_lines.append((rendered, sum(image.get_width() for image, _ in rendered)))
+
+    block_width = max([line_width for _, line_width in rendered_lines] + [1])
+    block_height = max(1, line_height * (len(lines) - 1) + max(f.get_height() for f in fonts.values()))
+    image = pygame.Surface((block_width, block_height), pygame.SRCALPHA)
+
+    for i, (rendered, line_width) in enumerate(rendered_lines):
+        if align == "left":
+            x = 0
+        elif align == "right":
+            x = block_width - line_width
+        else:
+            x = (block_width - line_width) // 2
+
+        # runs of different sizes share a baseline
+        for run_image, run_font in rendered:
+            image.blit(run_image, (x, i * line_height + ascent - run_font.get_ascent()))
+            x += run_image.get_width()
+
+    layout = (image, len(lines))
+    text_layout_cache[key] = layout
+    if len(text_layout_cache) > MAX_TEXT_LAYOUTS:
+        text_layout_cache.popitem(last=False)
+    return layout
+
+
+# multi-line text object (see ``layout_text``)
+class TextBlock(pygame.sprite.Sprite):
+    def __init__(self, text, x, y, width, size, font=default_font, color=WHITE, small_size=None, line_height=None, align="center", centered=False):
+        pygame.sprite.Sprite.__init__(self)
+        self.text = str(text)
+        self.image, self.num_lines = layout_text(self.text, width, size, font, color, small_size, line_height, align)
+        self.rect = self.image.get_rect()
+        if centered:
+            self.rect.center = (x, y)
+        else:
+            self.rect.topleft = (x, y)
+
+    def draw(self, display):
+        display.blit(self.image, self.rect)
+
+
 """ Various Utilities """
 
 # get general information about a game
@@ -476,6 +1012,9 @@ default_group = pygame.sprite.Group()
 
 # generic UI element
 class UiElement(pygame.sprite.Sprite):
+    # label and availability are drawn into the room's static layer (animated elements are redrawn every frame)
+    animated = False
+
     def __init__(self, label, x, y, row, col, size=8, font=default_font, centered=False, group=None, func=None):
         """
         UI element that can be selected and activated via keyboard/controller navigation.
@@ -498,6 +1037,9 @@ class UiElement(pygame.sprite.Sprite):
         else:
             pygame.sprite.Sprite.__init__(self, group)
 
+        # called with ``static=True`` for label/availability changes and ``static=False`` for selection changes
+        self.on_change = None
+
         self.x = x
         self.y = y
         self.row = row
@@ -566,27 +1108,41 @@ class UiElement(pygame.sprite.Sprite):
                 self.rect.center = self.original_pos
 
             self.label = new_label
+            self._changed(True)
+
+    @property
+    def available(self):
+        return self._available
+
+    @available.setter
+    def available(self, available):
+        if available != getattr(self, "_available", None):
+            self._available = available
+            self._changed(True)
+
+    def _changed(self, static):
+        if self.on_change is not None:
+            self.on_change(static)
 
     def update(self, dt, col, row):
         self.check_selected(col, row)
-        if self.label_type == 0:
+        if self.label_type == 0 and self.text.rect.center != self.rect.center:
             self.text.rect.center = self.rect.center
             self.gray_rect.center = self.rect.center
+            self._changed(True)
 
     def check_selected(self, col, row):
-        self.selected = False
-        if row == self.row and col == self.col:
-            self.selected = True
+        selected = row == self.row and col == self.col
+        if selected != self.selected:
+            self.selected = selected
+            self._changed(False)
 
     def action(self):
         if self.func is not None:
             if self.available:
                 self.func()
 
-    def draw(self, display):
-        if self.selected:
-            pygame.draw.rect(display, WHITE, self.rect, 3, border_radius=3)
-
+    def draw_label(self, display):
         if self.label_type == 0:
             self.text.draw(display)
         elif self.label_type == 1:
@@ -595,6 +1151,14 @@ class UiElement(pygame.sprite.Sprite):
         if not self.available:
             display.blit(self.gray_surf, self.gray_rect, special_flags=pygame.BLEND_RGB_MIN)
 
+    def draw_selection(self, display):
+        if self.selected:
+            pygame.draw.rect(display, WHITE, self.rect, 3, border_radius=3)
+
+    def draw(self, display):
+        self.draw_selection(display)
+        self.draw_label(display)
+
 
 # UI Manager
 class UiManager:
@@ -657,6 +1221,10 @@ class UiManager:
     def get_ui(self, x, y):
         return self.master_ui_dict[y][x]
 
+    def set_on_change(self, on_change):
+        for ui in self.master_ui_list:
+            ui.on_change = on_change
+
     def action(self):
         self.master_ui_dict[self.y_index][self.x_index].action()
         return self.get_ui(self.x_index, self.y_index)
@@ -665,6 +1233,78 @@ class UiManager:
         for ui in self.master_ui_list:
             ui.draw(display)
 
+    def draw_static(self, display):
+        """labels of the elements that only change through ``on_change``"""
+        for ui in self.master_ui_list:
+            if not getattr(ui, "animated", True):
+                ui.draw_label(display)
+
+    def draw_dynamic(self, display):
+        """selection outlines and animated elements"""
+        for ui in self.master_ui_list:
+            if getattr(ui, "animated", True):
+                ui.draw(display)
+            else:
+                ui.draw_selection(display)
+
+
+# solid-color overlay for fades and dimming
+class Overlay:
+    def __init__(self, rect, color=BLACK, alpha=0):
+        """
+        Solid-color overlay that avoids per-pixel alpha wherever it can. On opaque targets
+        (e.g. the display) it is drawn as two blended fills whose colors are precomputed
+        whenever the alpha changes, nothing is drawn at alpha 0 and alpha 255 is a plain fill.
+        Targets with per-pixel alpha (e.g. room surfaces) get a regular alpha blit.
+
+        :param rect: area covered by the overlay
+        """
+        self.rect = pygame.Rect(rect)
+        self.color = color
+        self.alpha = 0
+
+        # dst * keep / 255 + add == dst * (1 - alpha) + color * alpha
+        self.keep_color = WHITE
+        self.add_color = BLACK
+
+        self.image = None
+        self.set_alpha(alpha)
+
+    def set_alpha(self, alpha):
+        alpha = max(0, min(int(alpha), 255))
+        if alpha != self.alpha:
+            self.alpha = alpha
+            self._update_colors()
+
+    def set_color(self, color):
+        if color != self.color:
+            self.color = color
+            if self.image is not None:
+                self.image.fill(self.color)
+            self._update_colors()
+
+    def _update_colors(self):
+        self.keep_color = (255 - self.alpha,) * 3
+        self.add_color = [(channel * self.alpha + 127) // 255 for channel in self.color[:3]]
+        if self.image is not None:
+            self.image.set_alpha(self.alpha)
+
+    def draw(self, display):
+        if self.alpha <= 0:
+            return
+
+        if display.get_flags() & pygame.SRCALPHA:
+            if self.image is None:
+                self.image = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+                self.image.fill(self.color)
+                self.image.set_alpha(self.alpha)
+            display.blit(self.image, self.rect)
+        elif self.alpha >= 255:
+            display.fill(self.color, self.rect)
+        else:
+            display.fill(self.keep_color, self.rect, special_flags=pygame.BLEND_RGB_MULT)
+            display.fill(self.add_color, self.rect, special_flags=pygame.BLEND_RGB_ADD)
+
 
 # notification object
 class Notification:
@@ -676,18 +1316,16 @@ class Notification:
         if self.display_timer.update(dt):
             self.alpha = max(0, self.alpha - 5 * dt)
 
-        self.text.update()
-
     def reset(self, msg=None):
         self.msg = str(msg)
         self.size = 9
         self.x = DISPLAY_WIDTH - 20
         self.y = 37
 
-        self.text = Text(self.msg, 0, 0, WHITE, self.size, font=retro_font)
+        self.text = TextBlock(self.msg, 0, 0, DISPLAY_WIDTH - 40, self.size, retro_font, align="right")
 
-        self.surf = pygame.Surface(self.text.rect.size).convert_alpha()
-        self.surf.set_colorkey(BLACK)
+        # own copy, since the layout is shared and gets faded here
+        self.surf = self.text.image.copy()
         self.rect = self.surf.get_rect()
         self.rect.topright = (self.x, self.y)
 
@@ -698,7 +1336,6 @@ class Notification:
 
     def draw(self, display):
         if self.alpha:
-            self.text.draw(self.surf)
             display.blit(self.surf, self.rect)
 
 
@@ -723,19 +1360,38 @@ class DialogMenu:
         self.ui_surf.fill(GRAY)
         self.ui_surf.set_colorkey(BLACK)
 
-        self.curtain = pygame.Surface((1, 1)).convert_alpha()
-        self.curtain = pygame.transform.scale(self.curtain, (screen.get_width(), screen.get_height() - 60))
-        self.curtain_rect = self.curtain.get_rect()
-        self.curtain_rect.topleft = (0, 30)
-
-        self.curtain.fill(DARKER_GRAY)
-
+        self.curtain = Overlay((0, 30, screen.get_width(), screen.get_height() - 60), DARKER_GRAY)
         self.curtain_alpha = 0
-        self.curtain.set_alpha(self.curtain_alpha)
         self.curtain_fade_speed = 10
 
+        # button sets by options, built once and reused by every dialog with the same options
+        self.button_sets = {}
+        self.ui_dirty = True
+
         self.reset(msg, instant, has_ui, options)
 
+    def _get_buttons(self, options):
+        key = tuple(options)
+        if key not in self.button_sets:
+            ui_group = pygame.sprite.Group()
+            for opt in options:
+                if opt in ["No", "Cancel"]:
+                    ok_btn = UiElement(opt, self.rect.width // 2 + 100, self.rect.height - 50, 0, 0, 20, font=retro_font, group=ui_group,
+                                       func=self.fade_out)
+                elif opt == "OK":
+                    ok_btn = UiElement(opt, self.rect.width // 2, self.rect.height - 50, 0, 0, 20, font=retro_font, group=ui_group,
+                                       func=self.fade_out)
+                elif opt in ["Yes", "Install", "Uninstall", "Remove"]:
+                    ok_btn = UiElement(opt, self.rect.width // 2 - 100, self.rect.height - 50, 0, 1, 20, font=retro_font, group=ui_group,
+                                       func=self.fade_out)
+            um = UiManager(ui_group)
+            um.set_on_change(self._buttons_changed)
+            self.button_sets[key] = um
+        return self.button_sets[key]
+
+    def _buttons_changed(self, static=True):
+        self.ui_dirty = True
+
     def reset(self, msg, instant=False, has_ui=False, options=["OK"], dialog_type=None):
         self.msg = msg
         self.dialog_type = dialog_type
@@ -752,7 +1408,6 @@ class DialogMenu:
 
         self.showing = False
         self.text = None
-        self.max_chars = 30
 
         self.show_timer = Timer(120)
 
@@ -764,80 +1419,18 @@ class DialogMenu:
 
         self.um = None
         if self.has_ui:
-            self.ui_group = pygame.sprite.Group()
-            for opt in options:
-                if opt in ["No", "Cancel"]:
-                    ok_btn = UiElement(opt, self.rect.width // 2 + 100, self.rect.height - 50, 0, 0, 20, font=retro_font, group=self.ui_group,
-                                       func=self.fade_out)
-                elif opt == "OK":
-                    ok_btn = UiElement(opt, self.rect.width // 2, self.rect.height - 50, 0, 0, 20, font=retro_font, group=self.ui_group,
-                                       func=self.fade_out)
-                elif opt in ["Yes", "Install", "Uninstall", "Remove"]:
-                    ok_btn = UiElement(opt, self.rect.width // 2 - 100, self.rect.height - 50, 0, 1, 20, font=retro_font, group=self.ui_group,
-                                       func=self.fade_out)
-            self.um = UiManager(self.ui_group)
+            self.um = self._get_buttons(options)
+            self.um.reset()
+            self.ui_dirty = True
 
-        self.small_msg = []
         if self.msg is not None:
             self.showing = True
 
-            letter_count = 0
-            line_count = 0
-            is_small = False
-            msg_list = [i for i in self.msg]
-
-            for i, v in enumerate(self.msg[:]):
-                letter_count += 1
-
-                # check for line break
-                if v == "\n":
-                    letter_count = 0
-                    line_count += 1
-
-                # check for small characters
-                if v == "^":
-                    is_small = not is_small
-
-                # insert line breaks if line exceeds max_chars
-                if letter_count >= self.max_chars:
-                    if msg_list[i] == " ":
-                        msg_list[i] = "\n"
-                        letter_count = 0
-                        line_count += 1
-
-                    self.msg = "".join(msg_list)
-
-                # add small characters to a separate list
-                if is_small:
-                    if v != "^":
-                        self.small_msg.append(v)
-
-            temp_msg = [i for i in self.msg]
-            temp_msg.reverse()
-            for i, v in enumerate(self.small_msg):
-                if v in temp_msg:
-                    temp_msg.remove(v)
-            temp_msg.reverse()
-
-            for i in range(line_count):
-                self.small_msg.insert(0, "\n")
-
-            self.msg = "".join([i if i != "^" else " " for i in temp_msg])
-
-            # convert all small characters from a list to a string
-            self.small_msg = "".join(self.small_msg[:])
-
-            msg_lines = self.msg.splitlines()
+            # first line centered a third of the way down, 2 lines of spacing per line
             normal_size = 15
-            for i, msg in enumerate(msg_lines):
-                text = Text(msg, self.rect.width // 2, (self.rect.height // 3) - 15 * (len(msg_lines)) // 2 + (normal_size * 2 * i), WHITE, normal_size, font=retro_font, centered=True)
-                text.draw(self.surf)
-
-            small_msg_lines = self.small_msg.splitlines()
-            small_size = 10
-            for i, msg in enumerate(small_msg_lines):
-                text = Text(msg, self.rect.width // 2, (self.rect.height // 3) - 15 * (len(msg_lines)) // 2 + (normal_size * 2 * i), WHITE, small_size, font=retro_font, centered=True)
-                text.draw(self.surf)
+            self.text = TextBlock(self.msg, 0, 0, self.width - 60, normal_size, retro_font, small_size=10, line_height=normal_size * 2)
+            self.text.rect.midtop = (self.rect.width // 2, self.rect.height // 3 - normal_size * self.text.num_lines // 2 - normal_size // 2)
+            self.text.draw(self.surf)
 
         self.choice = None
 
@@ -847,7 +1440,7 @@ class DialogMenu:
     def update(self, dt):
         self.surf.set_alpha(int(self.alpha))
         self.ui_surf.set_alpha(int(self.alpha))
-        self.curtain.set_alpha(int(self.curtain_alpha))
+        self.curtain.set_alpha(self.curtain_alpha)
 
         if self.has_ui:
             self.um.update(dt)
@@ -873,22 +1466,65 @@ class DialogMenu:
 
     def draw(self, display):
         if self.alpha:
-            display.blit(self.curtain, self.curtain_rect)
-            if self.has_ui:
+            self.curtain.draw(display)
+            if self.has_ui and self.ui_dirty:
                 self.ui_surf.fill(BLACK)
                 self.um.draw(self.ui_surf)
+                self.ui_dirty = False
             display.blit(self.surf, self.rect)
             if self.has_ui:
                 display.blit(self.ui_surf, self.rect)
 
 
+# completion lookup for text fields (matching ignores case)
+class PrefixTrie:
+    def __init__(self, words=()):
+        self.clear()
+        for word in words:
+            self.insert(word)
+
+    def clear(self):
+        # nodes are [children, heaviest word below them], so a lookup never walks a subtree
+        self.root = [{}, None]
+        self.weights = {}
+
+    def insert(self, word, weight=1):
+        """add ``word`` or raise its weight (the heaviest word is completed first)"""
+        if not word or weight <= self.weights.get(word, 0):
+            return
+        self.weights[word] = weight
+
+        node = self.root
+        for char in word.lower():
+            node = node[0].setdefault(char, [{}, None])
+            if node[1] is None or weight > self.weights[node[1]]:
+                node[1] = word
+
+    def complete(self, prefix):
+        """best word that starts with ``prefix`` and is longer than it (or None)"""
+        if not prefix:
+            return None
+
+        node = self.root
+        for char in prefix.lower():
+            node = node[0].get(char)
+            if node is None:
+                return None
+
+        if len(node[1]) > len(prefix):
+            return node[1]
+
+        # the prefix is a word itself, so the best completion is the heaviest word below it
+        words = [child[1] for child in node[0].values()]
+        return max(words, key=self.weights.get) if words else None
+
+
 # text field
 class TextField(pygame.sprite.Sprite):
-    def __init__(self, x, y, row, col, w, h, default_text, group, keyboard, needs_hash=False):
+    def __init__(self, x, y, row, col, w, h, default_text, group, keyboard, needs_hash=False, completions=None):
         pygame.sprite.Sprite.__init__(self, group)
 
         self.size = h//2
-        self.text = Text("", self.size//2, self.size//2, WHITE, self.size, retro_font, False)
         self.default_text = Text(default_text, w//2, h//2, (180, 180, 180), self.size*2//3 - 2, retro_font, True)
 
         self.text_input = ""
@@ -914,6 +1550,17 @@ class TextField(pygame.sprite.Sprite):
 
         self.value = ""
 
+        # the shown text is built up one glyph at a time, so a keystroke only renders what changed
+        self.line = pygame.Surface((w, get_font(retro_font, self.size).get_height())).convert()
+        self.line.fill(GRAY)
+        self.shown = ""
+        self.offsets = [0]
+        self.dirty = True
+
+        # completion of the typed text (e.g. known SSIDs), accepted with ``accept_completion``
+        self.completions = completions
+        self.suggestion = None
+
         self.in_view = False
         self.speed = 0.15
 
@@ -943,37 +1590,83 @@ class TextField(pygame.sprite.Sprite):
     def action(self):
         self.keyboard.toggle(self)
         self.hashed = False
-        self.text.set_text(self.value)
+        self.refresh()
 
     def update_text(self, k):
         if k != "BACKSPACE":
-            self.text_input += k
+            self.set_value(self.text_input + k)
         else:
-            self.text_input = self.text_input[:len(self.text_input) - 1]
-
-        self.text.set_text(self.text_input)
-        if len(self.text_input) > self.max_chars:
-            self.scroll = -(len(self.text_input) - 1 - self.max_chars) * self.size
-            self.text.rect.x = self.scroll
-
-        self.value = self.text_input
-
-        if self.hashed:
-            self.text.set_text("*" * len(self.value))
+            self.set_value(self.text_input[:len(self.text_input) - 1])
+
+    def accept_completion(self):
+        if self.suggestion is not None:
+            self.set_value(self.suggestion)
+
+    def set_value(self, value):
+        self.text_input = value
+        self.value = value
+        self.scroll = -max(0, len(value) - self.max_chars) * self.size
+        self.refresh()
+
+    def refresh(self):
+        """bring the shown text and suggestion up to date (after ``value``, ``hashed`` or ``in_view`` change)"""
+        shown = "*" * len(self.value) if self.hashed else self.value
+        if shown != self.shown:
+            self._render_line(shown)
+
+        suggestion = None
+        if self.completions is not None and self.in_view and not self.hashed:
+            suggestion = self.completions.complete(self.value)
+        if suggestion != self.suggestion:
+            self.suggestion = suggestion
+            self.dirty = True
+
+    def _render_line(self, shown):
+        # clear everything after the part that stayed the same
+        keep = len(os.path.commonprefix([self.shown, shown]))
+        end = self.offsets[-1]
+        del self.offsets[keep + 1:]
+        if end > self.offsets[-1]:
+            self.line.fill(GRAY, (self.offsets[-1], 0, end - self.offsets[-1], self.line.get_height()))
+
+        for char in shown[keep:]:
+            glyph = get_glyph(retro_font, self.size, char, WHITE)
+            x = self.offsets[-1]
+            if x + glyph.get_width() > self.line.get_width():
+                line = pygame.Surface((self.line.get_width() * 2, self.line.get_height())).convert()
+                line.fill(GRAY)
+                line.blit(self.line, (0, 0))
+                self.line = line
+            self.line.blit(glyph, (x, 0))
+            self.offsets.append(x + glyph.get_width())
+
+        self.shown = shown
+        self.dirty = True
+
+    def _redraw(self):
+        self.image.fill(GRAY)
+        if self.shown:
+            x = self.size//2 + self.scroll
+            self.image.blit(self.line, (x, self.size//2), (0, 0, self.offsets[-1], self.line.get_height()))
+
+            if self.suggestion is not None:
+                x += self.offsets[-1]
+                for char in self.suggestion[len(self.value):]:
+                    if x >= self.image.get_width():
+                        break
+                    glyph = get_glyph(retro_font, self.size, char, (120, 120, 120))
+                    self.image.blit(glyph, (x, self.size//2))
+                    x += glyph.get_width()
         else:
-            self.text.set_text(self.value)
+            self.default_text.draw(self.image)
+        self.dirty = False
 
     def clear(self):
-        self.text.set_text("")
-        self.text_input = ""
-        self.value = ""
+        self.set_value("")
 
     def draw(self, display):
-        self.image.fill(GRAY)
-        if len(self.text_input):
-            self.text.draw(self.image)
-        else:
-            self.default_text.draw(self.image)
+        if self.dirty:
+            self._redraw()
         display.blit(self.image, self.actual_rect)
         pygame.draw.rect(display, GRAY, self.actual_rect, 4)
         if self.true_selected and not self.selected:
@@ -986,7 +1679,15 @@ class TextField(pygame.sprite.Sprite):
 
 # room object
 class Room:
-    def __init__(self, x, y):
+    def __init__(self, x, y, animated=True):
+        """
+        Room made of two layers: a static layer (background, texts and UI labels) that is only
+        rebuilt when one of its elements reports a change, and a dynamic layer (selection
+        outlines, animated elements) drawn on top of it.
+
+        :param animated: whether the room has to be re-composed every frame. Other rooms keep
+                         their last composition until something in them changes.
+        """
         self.orig_x = x
         self.orig_y = y
 
@@ -1001,6 +1702,16 @@ class Room:
 
         self.moving = False
 
+        self.static_layer = self.surf.copy()
+        self.background = []
+        self.static_items = []
+        self.ui_manager = None
+
+        self.visible = False
+        self.animated = animated
+        self.static_dirty = True
+        self.dirty = True
+
     def move(self, dx=0, dy=0):
         self.x = dx
         self.y = dy
@@ -1009,6 +1720,55 @@ class Room:
     def clear(self):
         self.surf.fill((0, 0, 0, 0))
 
+    """layers"""
+    def set_background(self, blits):
+        """(surface, position) pairs drawn under everything else"""
+        self.background = list(blits)
+        self.invalidate()
+
+    def add_static(self, *items):
+        """items with ``draw(surface)`` and an ``on_change`` hook (e.g. ``Text``)"""
+        for item in items:
+            item.on_change = self.invalidate
+            self.static_items.append(item)
+        self.invalidate()
+
+    def set_ui_manager(self, ui_manager):
+        self.ui_manager = ui_manager
+        ui_manager.set_on_change(self.invalidate)
+        self.invalidate()
+
+    def invalidate(self, static=True):
+        if static:
+            self.static_dirty = True
+        self.dirty = True
+
+    def update_visibility(self, bounds):
+        self.visible = self.rect.colliderect(bounds)
+
+    def needs_redraw(self):
+        return self.visible and (self.animated or self.dirty)
+
+    def _build_static(self):
+        self.static_layer.fill((0, 0, 0, 0))
+        self.static_layer.blits(self.background, doreturn=False)
+        for item in self.static_items:
+            item.draw(self.static_layer)
+        if self.ui_manager is not None:
+            self.ui_manager.draw_static(self.static_layer)
+        self.static_dirty = False
+
+    def compose(self):
+        """static layer plus the dynamic ui (anything else animated is drawn on top by the caller)"""
+        if self.static_dirty:
+            self._build_static()
+
+        self.clear()
+        self.surf.blit(self.static_layer, (0, 0))
+        if self.ui_manager is not None:
+            self.ui_manager.draw_dynamic(self.surf)
+        self.dirty = False
+
     def update_pos(self, dt):
         if self.moving:
             actual_target_x = self.x * DISPLAY_WIDTH
@@ -1035,15 +1795,19 @@ class Room:
 # room manager
 class RoomManager:
     def __init__(self, rooms):
+        """only rooms that overlap the screen are cleared, drawn and blitted"""
         self.rooms = rooms
         self.x = 0
         self.y = 0
         self.current_room = list(self.rooms.values())[0]
-        self.active_rooms = [self.current_room[0]]
+
+        self.bounds = pygame.FRect(0, 0, DISPLAY_WIDTH, DISPLAY_HEIGHT)
+        self.visible_rooms = []
+        self.redraw_rooms = []
+        self._update_visibility()
 
     def switch_to(self, name):
         target_room = self.rooms[name]
-        self.active_rooms = [self.current_room[0], target_room[0]]
         target_room[2].reset()
         target_room[0].move(0, 0)
         if target_room[2] is not None:
@@ -1056,16 +1820,32 @@ class RoomManager:
         self.current_room = target_room
         return self.current_room
 
+    def _update_visibility(self):
+        self.visible_rooms = []
+        for room in self.rooms.values():
+            room[0].update_visibility(self.bounds)
+            if room[0].visible:
+                self.visible_rooms.append(room)
+
     def update(self, dt):
-        for _, room in self.rooms.items():
+        for room in self.rooms.values():
             room[0].update_pos(dt)
+        self._update_visibility()
 
-    def clear(self):
-        for _, room in self.rooms.items():
-            room[0].clear()
+    def compose(self):
+        """re-compose the visible rooms that changed (and return them)"""
+        self.redraw_rooms = []
+        for room in self.visible_rooms:
+            if room[0].needs_redraw():
+                room[0].compose()
+                self.redraw_rooms.append(room)
+        return self.redraw_rooms
+
+    def needs_redraw(self, name):
+        return any(room[3] == name for room in self.redraw_rooms)
 
     def draw(self, display):
-        for _, room in self.rooms.items():
+        for room in self.visible_rooms:
             room[0].draw(display)
 
 
@@ -1088,16 +1868,24 @@ class SystemClock:
         self.round_clock = not self.round_clock
 
 
-__all__ = ["init_logger",
+__all__ = ["temp_dir",
+           "init_logger",
            "quit_logger",
+           "BootTimeline",
            "CompatibilityManager",
+           "init_mixer",
+           "set_audio_driver",
+           "AudioDriverCache",
            "AudioManager",
            "NetworkManager",
            "DataManager",
            "load_image",
            "get_font",
+           "get_glyph",
            "draw_text",
            "Text",
+           "TextBlock",
+           "layout_text",
            "get_game_info",
            "ease_out_to",
            "load_thumbnail",
@@ -1107,7 +1895,9 @@ __all__ = ["init_logger",
            "retro_font",
            "UiElement",
            "UiManager",
+           "PrefixTrie",
            "TextField",
+           "Overlay",
            "Notification",
            "DialogMenu",
            "Room",
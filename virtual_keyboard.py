@@ -11,6 +11,14 @@ from constants import *
 
 # virtual keyboard object
 class VirtualKeyboard:
+    # held directions repeat after `repeat_delay` frames, then speed up to one key every `min_repeat_interval` frames
+    repeat_delay = 20
+    repeat_interval = 8
+    repeat_acceleration = 0.8
+    min_repeat_interval = 2
+
+    directions = {"UP": (0, -1), "DOWN": (0, 1), "LEFT": (-1, 0), "RIGHT": (1, 0)}
+
     def __init__(self):
         self.um = None
 
@@ -27,27 +35,29 @@ class VirtualKeyboard:
         self.button_group = pygame.sprite.Group()
         self.button_rects = []
         self.button_shadow_rects = []
+        self.key_map = {}
         self._setup_buttons()
         self.button_manager = UiManager(self.button_group, False)
+        self.button_manager.set_on_change(self._selection_changed)
 
-        self.image = pygame.Surface((self.width, self.height)).convert_alpha()
-        self.image.set_colorkey(BLACK)
-        self.image.fill(BLACK)
+        # background, buttons and labels never change, so they are rendered once (the gradient covers every pixel)
+        self.image = pygame.Surface((self.width, self.height)).convert()
         for i in range(125):
             pygame.draw.line(self.image, ([max(80 - i//2, 40) for _ in range(3)]), (0, i*2), (self.width, i*2), 2)
         self.rect = self.image.get_rect()
         self.rect.midtop = (HALF_DISPLAY_WIDTH, DISPLAY_HEIGHT)
 
-        self.button_image = self.image.copy()
-        self.button_image.set_colorkey(BLACK)
-        self.button_image.fill(BLACK)
         for rect in self.button_shadow_rects:
-            pygame.draw.rect(self.button_image, (40, 40, 40), rect, border_radius=3)
+            pygame.draw.rect(self.image, (40, 40, 40), rect, border_radius=3)
         for rect in self.button_rects:
-            pygame.draw.rect(self.button_image, (20, 20, 20), rect, border_radius=3)
+            pygame.draw.rect(self.image, (20, 20, 20), rect, border_radius=3)
+        self.button_manager.draw_static(self.image)
 
+        # key grid plus the selection outline (only the outline is redrawn when it moves)
         self.ui_image = self.image.copy()
-        self.ui_image.set_colorkey(BLACK)
+        self.highlighted = None
+        self.selection_dirty = True
+        self.needs_ui_update = True
 
         self.toggled = False
         self.target_scroll = 100
@@ -57,6 +67,10 @@ class VirtualKeyboard:
 
         self.last_key = None
 
+        self.held_action = None
+        self.repeat_timer = 0
+        self.current_interval = self.repeat_interval
+
         self._setup_curtain()
 
     def _setup_keys(self):
@@ -73,6 +87,7 @@ class VirtualKeyboard:
                             row, col, group=self.button_group, size=self.size, font=retro_font, centered=True, func=self._return_key)
             btn_rect = btn.rect.copy().inflate(-10, -10)
             self.button_rects.append(btn_rect)
+            self.key_map[(row, col)] = key
 
             col += 1
             if col >= 20:
@@ -101,22 +116,12 @@ class VirtualKeyboard:
             self.button_shadow_rects.append(r)
 
     def _setup_curtain(self):
-        self.curtain = pygame.Surface((1, 1)).convert_alpha()
-        self.curtain = pygame.transform.scale(self.curtain, (DISPLAY_WIDTH, DISPLAY_HEIGHT - 60))
-        self.curtain_rect = self.curtain.get_rect()
-        self.curtain_rect.topleft = (0, 30)
-
-        self.curtain.fill(DARKER_GRAY)
-
+        self.curtain = Overlay((0, 30, DISPLAY_WIDTH, DISPLAY_HEIGHT - 60), DARKER_GRAY)
         self.curtain_alpha = 0
-        self.curtain.set_alpha(self.curtain_alpha)
         self.curtain_fade_speed = 10
 
     def _return_key(self):
-        btn_mgr = self.button_manager
-        current_y = btn_mgr.y_index
-        lookup_pos = btn_mgr.x_index + sum([len(btn_mgr.master_ui_dict[i]) for i in range(current_y)])
-        self.last_key = self.keys[lookup_pos]
+        self.last_key = self.key_map[(self.button_manager.y_index, self.button_manager.x_index)]
 
     def _return_space(self):
         self.last_key = " "
@@ -124,9 +129,38 @@ class VirtualKeyboard:
     def _return_backspace(self):
         self.last_key = "BACKSPACE"
 
+    def _move(self, action):
+        dx, dy = self.directions[action]
+        if dy:
+            self.button_manager.change_row(dy)
+        if dx:
+            self.button_manager.change_col(dx)
+        self.needs_ui_update = True
+
+    def _selection_changed(self, static=False):
+        self.selection_dirty = True
+
+    def _draw_selection(self):
+        # restore the old outline's area from the clean grid, then outline the new key
+        if self.highlighted is not None:
+            area = self.highlighted.rect.inflate(2, 2)
+            self.ui_image.blit(self.image, area, area)
+
+        self.highlighted = None
+        if self.button_manager.active:
+            self.highlighted = self.button_manager.get_ui(self.button_manager.x_index, self.button_manager.y_index)
+            self.highlighted.draw_selection(self.ui_image)
+        self.selection_dirty = False
+
+    def is_hidden(self):
+        """fully scrolled off-screen with nothing left to animate"""
+        return not self.toggled and self.scroll == self.target_scroll and not self.curtain_alpha
+
     def toggle(self, text_field=None):
         self.last_key = ""
         self.toggled = not self.toggled
+        self.needs_ui_update = True
+        self.held_action = None
         if self.toggled:
             self.button_manager.reset()
             self.text_field = text_field
@@ -136,10 +170,26 @@ class VirtualKeyboard:
                 self.text_field.in_view = False
                 if self.text_field.needs_hash:
                     self.text_field.hashed = True
+                self.text_field.refresh()
 
     def update(self, dt):
-        self.button_manager.update(dt)
-        self.curtain.set_alpha(int(self.curtain_alpha))
+        if self.is_hidden():
+            return
+
+        # selection only changes through `toggle` and `handle_event`
+        if self.needs_ui_update:
+            self.button_manager.update(dt)
+            self.needs_ui_update = False
+
+        # auto-repeat (each repeat comes a little sooner than the last)
+        if self.held_action is not None and self.toggled:
+            self.repeat_timer -= dt
+            while self.repeat_timer <= 0:
+                self._move(self.held_action)
+                self.current_interval = max(self.min_repeat_interval, self.current_interval * self.repeat_acceleration)
+                self.repeat_timer += self.current_interval
+
+        self.curtain.set_alpha(self.curtain_alpha)
 
         if self.toggled:
             self.target_scroll = -225
@@ -154,15 +204,17 @@ class VirtualKeyboard:
             self.scroll = ease_out_to(self.scroll, self.target_scroll, 0.15 * dt)
 
     def handle_event(self, event, text_fields=None):
-        if event.key == pygame.K_UP:
-            self.button_manager.change_row(-1)
-        if event.key == pygame.K_DOWN:
-            self.button_manager.change_row(1)
-        if event.key == pygame.K_LEFT:
-            self.button_manager.change_col(-1)
-        if event.key == pygame.K_RIGHT:
-            self.button_manager.change_col(1)
-        if event.key == pygame.K_RETURN:
+        """handle a pressed ``InputEvent``"""
+        self.needs_ui_update = True
+        if event.action in self.directions:
+            self._move(event.action)
+            self.held_action = event.action
+            self.repeat_timer = self.repeat_delay
+            self.current_interval = self.repeat_interval
+        if event.action == "SELECT":
+            if self.text_field is not None:
+                self.text_field.accept_completion()
+        if event.action in ["A", "START"]:
             self.button_manager.action()
             self.clicking = True
             if text_fields is not None:
@@ -171,16 +223,20 @@ class VirtualKeyboard:
                     selected_text_field = selected_fields[0]
                     selected_text_field.update_text(self.last_key)
 
+    def handle_release(self, event):
+        if event.action == self.held_action:
+            self.held_action = None
+
     def draw(self, display):
+        if self.is_hidden():
+            return
+
         if self.curtain_alpha:
-            display.blit(self.curtain, self.curtain_rect)
+            self.curtain.draw(display)
             self.text_field.draw(display)
 
-        display.blit(self.image, (self.rect.x, self.rect.y + self.scroll))
-        display.blit(self.button_image, (self.rect.x, self.rect.y + self.scroll))
-
-        self.ui_image.fill(BLACK)
-        self.button_manager.draw(self.ui_image)
+        if self.selection_dirty:
+            self._draw_selection()
         display.blit(self.ui_image, (self.rect.x, self.rect.y + self.scroll))
 
 